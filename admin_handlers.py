@@ -107,7 +107,7 @@ async def admin_categories_callback(callback: CallbackQuery) -> None:
         )
     )
     
-    await edit_message(callback, text, get_categories_keyboard())
+    await edit_message(callback, text, await get_categories_keyboard())
 
 @router.callback_query(AdminCallback.filter(F.action == "products"))
 async def admin_products_callback(callback: CallbackQuery) -> None:
@@ -125,7 +125,7 @@ async def admin_products_callback(callback: CallbackQuery) -> None:
         )
     )
     
-    await edit_message(callback, text, get_products_keyboard())
+    await edit_message(callback, text, await get_products_keyboard())
 
 @router.callback_query(AdminCallback.filter(F.action == "tests"))
 async def admin_tests_callback(callback: CallbackQuery) -> None:
@@ -186,7 +186,7 @@ async def category_list_callback(
     await edit_message(
         callback,
         text,
-        get_categories_keyboard(page=callback_data.page)
+        await get_categories_keyboard(page=callback_data.page)
     )
 
 @router.callback_query(AdminCategoryCallback.filter(F.action == "edit"))
@@ -316,7 +316,7 @@ async def product_list_callback(
     await edit_message(
         callback,
         text,
-        get_products_keyboard(
+        await get_products_keyboard(
             category_id=callback_data.category_id,
             page=callback_data.page
         )
@@ -334,7 +334,7 @@ async def product_edit_callback(
         return
     
     try:
-        product = db.get_product(callback_data.product_id)
+        product = await db.get_product(callback_data.product_id)
         if not product:
             raise ValueError("Товар не найден")
         
@@ -732,7 +732,7 @@ async def stats_products_callback(callback: CallbackQuery) -> None:
     
     try:
         # Get product statistics
-        categories = db.get_categories()
+        categories = await db.get_categories()
         total_products = 0
         active_products = 0
         
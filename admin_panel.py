@@ -28,6 +28,9 @@ from utils.message_utils import format_error_message, truncate_message
 # Setup logging
 logger = logging.getLogger(__name__)
 
+# Admin IDs as a set so every admin check is a hash lookup
+_ADMIN_IDS = frozenset(ADMIN_IDS)
+
 # Initialize router
 router = Router()
 
@@ -72,7 +75,7 @@ def is_admin(user_id: int) -> bool:
     """Check if user is an admin"""
     if not ENABLE_ADMIN_PANEL:
         return False
-    return user_id in ADMIN_IDS
+    return user_id in _ADMIN_IDS
 
 def get_admin_keyboard() -> InlineKeyboardMarkup:
     """Generate main admin panel keyboard"""
@@ -86,12 +89,12 @@ def get_admin_keyboard() -> InlineKeyboardMarkup:
     builder.adjust(2)  # 2 buttons per row
     return builder.as_markup()
 
-def get_categories_keyboard(page: int = 1, per_page: int = 5) -> InlineKeyboardMarkup:
+async def get_categories_keyboard(page: int = 1, per_page: int = 5) -> InlineKeyboardMarkup:
     """Generate categories management keyboard"""
     builder = InlineKeyboardBuilder()
     
     # Get categories for current page
-    categories = db.get_categories(include_inactive=True)
+    categories = await db.get_categories(include_inactive=True)
     start_idx = (page - 1) * per_page
     end_idx = start_idx + per_page
     page_categories = categories[start_idx:end_idx]
@@ -153,19 +156,19 @@ def get_categories_keyboard(page: int = 1, per_page: int = 5) -> InlineKeyboardM
     builder.adjust(1)  # One button per row for categories
     return builder.as_markup()
 
-def get_products_keyboard(category_id: Optional[int] = None, page: int = 1, per_page: int = 5) -> InlineKeyboardMarkup:
+async def get_products_keyboard(category_id: Optional[int] = None, page: int = 1, per_page: int = 5) -> InlineKeyboardMarkup:
     """Generate products management keyboard"""
     builder = InlineKeyboardBuilder()
     
     # Get products for current page
     if category_id:
-        products = db.get_products_by_category(category_id, include_inactive=True)
+        products = await db.get_products_by_category(category_id, include_inactive=True)
     else:
         # Get all products if no category specified
         products = []
-        categories = db.get_categories(include_inactive=True)
+        categories = await db.get_categories(include_inactive=True)
         for category in categories:
-            products.extend(db.get_products_by_category(category['id'], include_inactive=True))
+            products.extend(await db.get_products_by_category(category['id'], include_inactive=True))
     
     start_idx = (page - 1) * per_page
     end_idx = start_idx + per_page
@@ -408,7 +411,7 @@ def create_admin_keyboard() -> InlineKeyboardMarkup:
 @router.message(Command("admin"))
 async def cmd_admin(message: Message):
     """Show admin panel"""
-    if message.from_user.id not in ADMIN_IDS:
+    if message.from_user.id not in _ADMIN_IDS:
         await message.answer("⚠️ У вас нет прав для выполнения этой команды.")
         return
     
@@ -421,7 +424,7 @@ async def cmd_admin(message: Message):
 @router.callback_query(F.data == "admin_stats")
 async def process_admin_stats(callback: CallbackQuery):
     """Show admin statistics"""
-    if callback.from_user.id not in ADMIN_IDS:
+    if callback.from_user.id not in _ADMIN_IDS:
         await callback.answer("У вас нет прав для выполнения этой команды")
         return
     
@@ -470,7 +473,7 @@ async def process_admin_stats(callback: CallbackQuery):
 @router.callback_query(F.data == "admin_users")
 async def process_admin_users(callback: CallbackQuery):
     """Show user management"""
-    if callback.from_user.id not in ADMIN_IDS:
+    if callback.from_user.id not in _ADMIN_IDS:
         await callback.answer("У вас нет прав для выполнения этой команды")
         return
     
@@ -524,13 +527,13 @@ async def process_admin_users(callback: CallbackQuery):
 @router.callback_query(F.data == "admin_categories")
 async def process_admin_categories(callback: CallbackQuery):
     """Show category management"""
-    if callback.from_user.id not in ADMIN_IDS:
+    if callback.from_user.id not in _ADMIN_IDS:
         await callback.answer("У вас нет прав для выполнения этой команды")
         return
     
     try:
         # Get categories
-        categories = db.get_categories(include_inactive=True)
+        categories = await db.get_categories(include_inactive=True)
         
         # Create category list
         category_list = []
@@ -572,13 +575,13 @@ async def process_admin_categories(callback: CallbackQuery):
 @router.callback_query(F.data == "admin_products")
 async def process_admin_products(callback: CallbackQuery):
     """Show product management"""
-    if callback.from_user.id not in ADMIN_IDS:
+    if callback.from_user.id not in _ADMIN_IDS:
         await callback.answer("У вас нет прав для выполнения этой команды")
         return
     
     try:
         # Get all products
-        categories = db.get_categories(include_inactive=False)
+        categories = await db.get_categories(include_inactive=False)
         total_products = 0
         product_list = []
         
@@ -624,7 +627,7 @@ async def process_admin_products(callback: CallbackQuery):
 @router.callback_query(F.data == "admin_tests")
 async def process_admin_tests(callback: CallbackQuery):
     """Show test management"""
-    if callback.from_user.id not in ADMIN_IDS:
+    if callback.from_user.id not in _ADMIN_IDS:
         await callback.answer("У вас нет прав для выполнения этой команды")
         return
     
@@ -677,7 +680,7 @@ async def process_admin_tests(callback: CallbackQuery):
 @router.callback_query(F.data == "admin_settings")
 async def process_admin_settings(callback: CallbackQuery):
     """Show admin settings"""
-    if callback.from_user.id not in ADMIN_IDS:
+    if callback.from_user.id not in _ADMIN_IDS:
         await callback.answer("У вас нет прав для выполнения этой команды")
         return
     
@@ -721,7 +724,7 @@ async def process_admin_settings(callback: CallbackQuery):
 @router.callback_query(F.data == "admin_backup")
 async def process_admin_backup(callback: CallbackQuery):
     """Create database backup"""
-    if callback.from_user.id not in ADMIN_IDS:
+    if callback.from_user.id not in _ADMIN_IDS:
         await callback.answer("У вас нет прав для выполнения этой команды")
         return
     
@@ -764,7 +767,7 @@ async def process_admin_backup(callback: CallbackQuery):
 @router.callback_query(F.data == "admin_vacuum")
 async def process_admin_vacuum(callback: CallbackQuery):
     """Optimize database"""
-    if callback.from_user.id not in ADMIN_IDS:
+    if callback.from_user.id not in _ADMIN_IDS:
         await callback.answer("У вас нет прав для выполнения этой команды")
         return
     
@@ -798,7 +801,7 @@ async def process_admin_vacuum(callback: CallbackQuery):
 @router.callback_query(F.data == "admin_cleanup")
 async def process_admin_cleanup(callback: CallbackQuery):
     """Clean up old data"""
-    if callback.from_user.id not in ADMIN_IDS:
+    if callback.from_user.id not in _ADMIN_IDS:
         await callback.answer("У вас нет прав для выполнения этой команды")
         return
     
@@ -828,7 +831,7 @@ async def process_admin_cleanup(callback: CallbackQuery):
 @router.callback_query(F.data == "admin_back")
 async def process_admin_back(callback: CallbackQuery):
     """Return to main admin menu"""
-    if callback.from_user.id not in ADMIN_IDS:
+    if callback.from_user.id not in _ADMIN_IDS:
         await callback.answer("У вас нет прав для выполнения этой команды")
         return
     
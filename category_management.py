@@ -157,13 +157,13 @@ def format_category_message(category: Dict[str, Any]) -> str:
     
     return truncate_message(message)
 
-def search_categories(query: str) -> List[Dict[str, Any]]:
+async def search_categories(query: str) -> List[Dict[str, Any]]:
     """Search categories by name or description"""
     if not query:
         return []
     
     # Get all categories
-    categories = db.get_categories(include_inactive=True)
+    categories = await db.get_categories(include_inactive=True)
     
     # Search in name and description
     query = query.lower()
@@ -207,7 +207,7 @@ def get_category_stats(category_id: int) -> Dict[str, Any]:
 async def list_categories_command(message: Message) -> None:
     """Handle /categories command"""
     try:
-        categories = db.get_categories()
+        categories = await db.get_categories()
         
         if not categories:
             await message.answer(
@@ -480,7 +480,7 @@ async def search_category_command(message: Message) -> None:
             return
         
         # Search categories
-        results = search_categories(query)
+        results = await search_categories(query)
         
         if not results:
             await message.answer(
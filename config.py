@@ -115,12 +115,7 @@ CACHE_MAX_SIZE = int(os.getenv('CACHE_MAX_SIZE', '1000'))
 # Security settings
 ALLOWED_UPDATES = [
     "message",
-    "edited_message",
-    "callback_query",
-    "inline_query",
-    "chosen_inline_result",
-    "my_chat_member",
-    "chat_member"
+    "callback_query"
 ]
 
 # Feature flags
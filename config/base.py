@@ -1,6 +1,6 @@
 """Base configuration module with type hints and validation."""
 
-from typing import List, Optional, Dict, Any, Union
+from typing import FrozenSet, List, Optional, Dict, Any, Union
 from pydantic import Field, validator
 from pydantic_settings import BaseSettings
 from pathlib import Path
@@ -21,13 +21,15 @@ class BaseConfig(BaseSettings):
     WEBHOOK_SECRET: Optional[str] = Field(None, description="Webhook secret token")
     WEBHOOK_PORT: int = Field(default=10000, description="Webhook port")
     WEBHOOK_URL: Optional[str] = Field(None, description="Full webhook URL (optional)")
+    WEBHOOK_MAX_CONNECTIONS: int = Field(default=100, ge=1, le=100, description="Max simultaneous webhook connections from Telegram")
+    DROP_PENDING_UPDATES: bool = Field(default=True, description="Drop updates queued by Telegram while the bot was down")
     
     # Server settings
     HOST: str = Field(default="0.0.0.0", description="Server host")
     PORT: int = Field(default=8000, description="Server port")
     
     # Admin settings
-    ADMIN_IDS: Union[List[int], str] = Field(..., description="List of admin user IDs (comma-separated string or list)")
+    ADMIN_IDS: Union[FrozenSet[int], str] = Field(..., description="Set of admin user IDs (comma-separated string or list)")
     
     # Database settings
     DB_FILE: Optional[Path] = Field(default=Path("bot.db"), description="Database file path")
@@ -47,15 +49,20 @@ class BaseConfig(BaseSettings):
     RATE_LIMIT_CALLBACKS: int = Field(default=30, ge=1, description="Callback rate limit per window")
     RATE_LIMIT_WINDOW: int = Field(default=60, ge=1, description="Rate limit window in seconds")
     
+    # Search settings
+    MIN_SEARCH_LENGTH: int = Field(default=3, ge=1, description="Minimum length of search query")
+    MAX_SEARCH_RESULTS: int = Field(default=10, ge=1, description="Maximum number of search results to show")
+    
     # Security
     ALLOWED_UPDATES: List[str] = Field(
-        default=["message", "edited_message", "callback_query"],
+        default=["message", "callback_query"],
         description="Allowed update types"
     )
     
     # Feature flags
     ENABLE_WEBHOOK: bool = Field(default=True, description="Enable webhook mode")
     ENABLE_POLLING: bool = Field(default=False, description="Enable polling mode")
+    POLLING_TIMEOUT: int = Field(default=30, ge=1, description="Long-polling timeout for getUpdates in seconds")
     ENABLE_METRICS: bool = Field(default=True, description="Enable metrics collection")
     ENABLE_HEALTH_CHECK: bool = Field(default=True, description="Enable health check endpoint")
     
@@ -98,8 +105,8 @@ class BaseConfig(BaseSettings):
         return None
     
     @validator("ADMIN_IDS", pre=True)
-    def validate_admin_ids(cls, v: Union[List[int], str]) -> List[int]:
-        """Validate and convert admin IDs to list of integers."""
+    def validate_admin_ids(cls, v: Union[List[int], str]) -> FrozenSet[int]:
+        """Validate and convert admin IDs to a frozenset of integers."""
         if isinstance(v, str):
             try:
                 # Split by comma and convert to integers
@@ -110,9 +117,10 @@ class BaseConfig(BaseSettings):
         if not v:
             raise ValueError("At least one ADMIN_ID is required")
         
-        return v
+        # Admin checks are membership tests on every update
+        return frozenset(int(x) for x in v)
     
-    @validator("WEBHOOK_SECRET")
+    @validator("WEBHOOK_SECRET", always=True)
     def validate_webhook_secret(cls, v: Optional[str], values: Dict[str, Any]) -> Optional[str]:
         """Validate webhook secret in production."""
         if values.get("ENVIRONMENT") == "production" and not v:
@@ -85,13 +85,7 @@ async def send_admin_menu(
         )
 
 # ===== ОСНОВНЫЕ ОБРАБОТЧИКИ =====
-@router.callback_query()
-async def debug_callback_handler(query: CallbackQuery):
-    """Debug handler for callback queries."""
-    logger.debug(f"Callback query: {query.data}")
-
 @router.message(Command("admin"))
-@router.callback_query(F.data == "admin")
 async def admin_handler(update: Message | CallbackQuery, state: FSMContext) -> None:
     """Handle admin panel access."""
     if not await check_admin_access(update.from_user.id, update if isinstance(update, CallbackQuery) else None):
@@ -100,7 +94,6 @@ async def admin_handler(update: Message | CallbackQuery, state: FSMContext) -> N
     await send_admin_menu(update)
 
 # ===== КАТЕГОРИИ =====
-@router.callback_query(F.data == "admin_categories")
 async def admin_categories_handler(query: CallbackQuery, state: FSMContext) -> None:
     """Управление категориями"""
     try:
@@ -110,7 +103,7 @@ async def admin_categories_handler(query: CallbackQuery, state: FSMContext) -> N
         logger.info(f"Categories menu opened by user {query.from_user.id}")
         await safe_clear_state(state)
         
-        categories = db.get_categories()
+        categories = await db.get_categories()
         buttons = []
         
         # Add category buttons
@@ -145,7 +138,6 @@ async def admin_categories_handler(query: CallbackQuery, state: FSMContext) -> N
         logger.error(f"Error in admin_categories_handler: {e}", exc_info=True)
         await query.answer("Произошла ошибка при загрузке категорий", show_alert=True)
 
-@router.callback_query(F.data == "create_category")
 async def create_category_handler(
     callback: CallbackQuery,
     state: FSMContext
@@ -167,7 +159,6 @@ async def create_category_handler(
         logger.error(f"Error in create_category_handler: {e}", exc_info=True)
         await callback.answer("Произошла ошибка при создании категории", show_alert=True)
 
-@router.callback_query(F.data.startswith("admin_category_edit:"))
 async def admin_category_edit_handler(
     query: CallbackQuery,
     state: FSMContext
@@ -180,7 +171,7 @@ async def admin_category_edit_handler(
         category_id = query.data.split(':')[1]
         logger.info(f"Admin editing category {category_id} by user {query.from_user.id}")
         
-        category = next((c for c in db.get_categories() if c['id'] == category_id), None)
+        category = next((c for c in await db.get_categories() if c['id'] == category_id), None)
         if not category:
             logger.error(f"Category {category_id} not found")
             await query.answer("Категория не найдена", show_alert=True)
@@ -198,7 +189,6 @@ async def admin_category_edit_handler(
         logger.error(f"Error in admin_category_edit_handler: {e}", exc_info=True)
         await query.answer("Произошла ошибка при редактировании категории", show_alert=True)
 
-@router.callback_query(F.data.startswith("admin_category_delete:"))
 async def admin_category_delete_handler(
     query: CallbackQuery,
     state: FSMContext
@@ -211,7 +201,7 @@ async def admin_category_delete_handler(
         category_id = query.data.split(':')[1]
         logger.info(f"Admin deleting category {category_id} by user {query.from_user.id}")
         
-        category = next((c for c in db.get_categories() if c['id'] == category_id), None)
+        category = next((c for c in await db.get_categories() if c['id'] == category_id), None)
         if not category:
             logger.error(f"Category {category_id} not found")
             await query.answer("Категория не найдена", show_alert=True)
@@ -243,7 +233,6 @@ async def admin_category_delete_handler(
         await query.answer("Произошла ошибка при удалении категории", show_alert=True)
 
 # ===== ТОВАРЫ =====
-@router.callback_query(F.data == "admin_products")
 async def admin_products_handler(query: CallbackQuery, state: FSMContext) -> None:
     """Управление товарами"""
     try:
@@ -253,7 +242,7 @@ async def admin_products_handler(query: CallbackQuery, state: FSMContext) -> Non
         logger.info(f"Products menu opened by user {query.from_user.id}")
         await safe_clear_state(state)
         
-        categories = db.get_categories()
+        categories = await db.get_categories()
         buttons = []
         
         # Add category buttons
@@ -288,7 +277,6 @@ async def admin_products_handler(query: CallbackQuery, state: FSMContext) -> Non
         logger.error(f"Error in admin_products_handler: {e}", exc_info=True)
         await query.answer("Произошла ошибка при загрузке меню товаров", show_alert=True)
 
-@router.callback_query(F.data.startswith("admin_products_category:"))
 async def admin_products_category_handler(
     query: CallbackQuery,
     state: FSMContext
@@ -302,7 +290,7 @@ async def admin_products_category_handler(
         logger.info(f"Admin viewing products in category {category_id} by user {query.from_user.id}")
         
         products = db.get_products_by_category(category_id)
-        category = next((c for c in db.get_categories() if c['id'] == category_id), None)
+        category = next((c for c in await db.get_categories() if c['id'] == category_id), None)
         
         if not category:
             logger.error(f"Category {category_id} not found")
@@ -325,7 +313,6 @@ async def admin_products_category_handler(
         logger.error(f"Error in admin_products_category_handler: {e}", exc_info=True)
         await query.answer("Произошла ошибка при загрузке товаров", show_alert=True)
 
-@router.callback_query(F.data.startswith("create_product:"))
 async def create_product_handler(
     callback: CallbackQuery,
     state: FSMContext
@@ -351,7 +338,6 @@ async def create_product_handler(
         logger.error(f"Error in create_product_handler: {e}", exc_info=True)
         await callback.answer("Произошла ошибка при создании товара", show_alert=True)
 
-@router.callback_query(F.data.startswith("admin_product_edit:"))
 async def admin_product_edit_handler(
     query: CallbackQuery,
     state: FSMContext
@@ -382,7 +368,6 @@ async def admin_product_edit_handler(
         logger.error(f"Error in admin_product_edit_handler: {e}", exc_info=True)
         await query.answer("Произошла ошибка при редактировании товара", show_alert=True)
 
-@router.callback_query(F.data.startswith("admin_product_delete:"))
 async def admin_product_delete_handler(
     query: CallbackQuery,
     state: FSMContext
@@ -417,7 +402,6 @@ async def admin_product_delete_handler(
         await query.answer("Произошла ошибка при удалении товара", show_alert=True)
 
 # ===== ТЕСТЫ =====
-@router.callback_query(F.data == "admin_tests")
 async def admin_tests_handler(query: CallbackQuery, state: FSMContext) -> None:
     """Управление тестами"""
     try:
@@ -462,7 +446,6 @@ async def admin_tests_handler(query: CallbackQuery, state: FSMContext) -> None:
         logger.error(f"Error in admin_tests_handler: {e}", exc_info=True)
         await query.answer("Произошла ошибка при загрузке тестов", show_alert=True)
 
-@router.callback_query(F.data.startswith("admin_test_edit:"))
 async def admin_test_edit_handler(
     query: CallbackQuery,
     state: FSMContext
@@ -493,7 +476,6 @@ async def admin_test_edit_handler(
         logger.error(f"Error in admin_test_edit_handler: {e}", exc_info=True)
         await query.answer("Произошла ошибка при редактировании теста", show_alert=True)
 
-@router.callback_query(F.data.startswith("admin_test_delete:"))
 async def admin_test_delete_handler(
     query: CallbackQuery,
     state: FSMContext
@@ -527,7 +509,6 @@ async def admin_test_delete_handler(
         logger.error(f"Error in admin_test_delete_handler: {e}", exc_info=True)
         await query.answer("Произошла ошибка при удалении теста", show_alert=True)
 
-@router.callback_query(F.data == "create_test")
 async def create_test_handler(
     query: CallbackQuery,
     state: FSMContext
@@ -550,7 +531,6 @@ async def create_test_handler(
         await query.answer("Произошла ошибка при создании теста", show_alert=True)
 
 # ===== СТАТИСТИКА =====
-@router.callback_query(F.data == "admin_stats")
 async def admin_stats_handler(query: CallbackQuery, state: FSMContext) -> None:
     """Просмотр статистики"""
     try:
@@ -582,7 +562,6 @@ async def admin_stats_handler(query: CallbackQuery, state: FSMContext) -> None:
         await query.answer("Произошла ошибка при загрузке статистики", show_alert=True)
 
 # ===== ПОИСК ТОВАРОВ =====
-@router.callback_query(F.data == "admin_search_products")
 async def admin_search_products_handler(
     query: CallbackQuery,
     state: FSMContext
@@ -647,7 +626,6 @@ async def process_name(message: Message, state: FSMContext):
     await safe_clear_state(state)
 
 # ===== ОТМЕНА ДЕЙСТВИЙ =====
-@router.callback_query(F.data.startswith("cancel_"))
 async def cancel_handler(
     query: CallbackQuery,
     state: FSMContext
@@ -707,7 +685,6 @@ async def show_admin_panel(message: Message, state: FSMContext):
             reply_markup=get_back_keyboard()
         )
 
-@router.callback_query(F.data == "admin_users")
 async def manage_users(callback: CallbackQuery, state: FSMContext):
     """Manage users handler."""
     try:
@@ -783,7 +760,6 @@ async def manage_users(callback: CallbackQuery, state: FSMContext):
             reply_markup=get_back_keyboard()
         )
 
-@router.callback_query(F.data == "admin_catalog")
 async def manage_catalog(callback: CallbackQuery, state: FSMContext):
     """Manage catalog handler."""
     try:
@@ -851,7 +827,6 @@ async def manage_catalog(callback: CallbackQuery, state: FSMContext):
             reply_markup=get_back_keyboard()
         )
 
-@router.callback_query(F.data == "admin_tests")
 async def manage_tests(callback: CallbackQuery, state: FSMContext):
     """Manage tests handler."""
     try:
@@ -938,7 +913,6 @@ async def manage_tests(callback: CallbackQuery, state: FSMContext):
             reply_markup=get_back_keyboard()
         )
 
-@router.callback_query(F.data == "admin_stats")
 async def view_stats(callback: CallbackQuery, state: FSMContext):
     """View stats handler."""
     try:
@@ -1015,7 +989,6 @@ async def view_stats(callback: CallbackQuery, state: FSMContext):
             reply_markup=get_back_keyboard()
         )
 
-@router.callback_query(F.data == "admin_settings")
 async def manage_settings(callback: CallbackQuery, state: FSMContext):
     """Show bot settings management interface."""
     if not is_admin(callback.from_user.id):
@@ -1060,12 +1033,48 @@ async def manage_settings(callback: CallbackQuery, state: FSMContext):
             reply_markup=get_back_keyboard()
         )
 
-@router.callback_query(F.data == "back_to_main")
 async def back_to_admin_panel(callback: CallbackQuery, state: FSMContext):
     """Return to admin panel."""
     await state.clear()
     await show_admin_panel(callback.message, state)
 
+# ===== МАРШРУТИЗАЦИЯ CALLBACK =====
+# Keyed on the part of callback data before ":"; first entry wins for
+# keys that used to have two handlers registered.
+_CALLBACK_ROUTES = {
+    "admin": admin_handler,
+    "admin_categories": admin_categories_handler,
+    "create_category": create_category_handler,
+    "admin_category_edit": admin_category_edit_handler,
+    "admin_category_delete": admin_category_delete_handler,
+    "admin_products": admin_products_handler,
+    "admin_products_category": admin_products_category_handler,
+    "create_product": create_product_handler,
+    "admin_product_edit": admin_product_edit_handler,
+    "admin_product_delete": admin_product_delete_handler,
+    "admin_tests": admin_tests_handler,
+    "admin_test_edit": admin_test_edit_handler,
+    "admin_test_delete": admin_test_delete_handler,
+    "create_test": create_test_handler,
+    "admin_stats": admin_stats_handler,
+    "admin_search_products": admin_search_products_handler,
+    "admin_users": manage_users,
+    "admin_catalog": manage_catalog,
+    "admin_settings": manage_settings,
+    "back_to_main": back_to_admin_panel,
+}
+
+@router.callback_query()
+async def admin_callback_dispatcher(query: CallbackQuery, state: FSMContext) -> None:
+    """Dispatch admin callback queries with a single dict lookup."""
+    logger.debug("Callback query: %s", query.data)
+    key = query.data.partition(":")[0]
+    handler = _CALLBACK_ROUTES.get(key)
+    if handler is None and key.startswith("cancel_"):
+        handler = cancel_handler
+    if handler is not None:
+        await handler(query, state)
+
 def setup_admin_handlers(application):
     """Setup admin handlers."""
     application.include_router(router)
@@ -1087,6 +1096,7 @@ __all__ = [
     'create_test_handler',
     'admin_stats_handler',
     'admin_search_products_handler',
+    'admin_callback_dispatcher',
     'show_admin_panel',
     'manage_users',
     'manage_catalog',
@@ -21,6 +21,10 @@ from monitoring.metrics import metrics_collector
 from config import ADMIN_IDS
 
 router = Router()
+# Callbacks outside these prefixes skip the whole router
+router.callback_query.filter(
+    F.data.startswith(("category_", "product_", "back_to_main", "back_to_catalog"))
+)
 logger = logging.getLogger(__name__)
 
 class CatalogStates(StatesGroup):
@@ -1,6 +1,7 @@
 from aiogram import types
 from aiogram.enums import ParseMode
 from aiogram.utils.media_group import MediaGroupBuilder
+import time
 from typing import Optional, Dict, List
 
 from sqlite_db import db  # Import the database instance
@@ -10,12 +11,66 @@ from utils.keyboards import (
     get_product_navigation_keyboard,
     get_back_to_categories_keyboard
 )
-from config import MIN_SEARCH_LENGTH, MAX_SEARCH_RESULTS
+from config import get_config
 from utils.message_utils import safe_edit_message
+from utils.cache_versions import get_products_version
+
+# Методы БД связываются один раз при импорте
+_get_categories = db.get_categories
+_get_product = db.get_product
+_get_category_with_products = db.get_category_with_products
+_search_products = db.search_products
+
+# Настройки поиска читаются один раз при импорте
+config = get_config()
+MIN_SEARCH_LENGTH = config.MIN_SEARCH_LENGTH
+MAX_SEARCH_RESULTS = config.MAX_SEARCH_RESULTS
+
+# Статические клавиатуры создаются один раз при импорте
+_BACK_TO_CATEGORIES_KB = get_back_to_categories_keyboard()
+_BACK_TO_CATEGORIES_ROW = [
+    types.InlineKeyboardButton(
+        text="🔙 К категориям",
+        callback_data="knowledge_base"
+    )
+]
+
+# Шаблоны сообщений поиска
+_SEARCH_PREFIX = "🔍"
+_SHORT_QUERY_MSG = (
+    f"🔍 Поисковый запрос должен содержать минимум {MIN_SEARCH_LENGTH} символа"
+)
+_NOT_FOUND_MSG = "🔍 По запросу \"{}\" ничего не найдено"
+_RESULTS_HEADER = "🔍 Результаты поиска \"{}\":\n"
+
+# Кэш клавиатур товаров. Ключ кэша — (category_id, версия списка товаров
+# из utils.cache_versions), поэтому изменение товаров категории
+# в этом процессе делает старую запись недостижимой без явной очистки.
+# Изменения из других процессов видны не позже чем через PRODUCTS_KB_TTL.
+_PRODUCTS_KB_CACHE_SIZE = 256
+PRODUCTS_KB_TTL = 60
+_products_kb_cache: Dict[tuple, tuple] = {}
 
 # Глобальный словарь для отслеживания состояния просмотра товаров
 product_view_state: Dict[int, Dict[str, int]] = {}  # {user_id: {product_id: current_image_index}}
 
+async def _build_products_keyboard(category_id: int) -> tuple:
+    """Возвращает (категория, есть ли товары, клавиатура) с кэшированием"""
+    key = (category_id, get_products_version(category_id))
+    cached = _products_kb_cache.get(key)
+    if cached is not None and time.monotonic() < cached[0]:
+        return cached[1]
+    
+    category, products = await _get_category_with_products(category_id)
+    keyboard = get_products_keyboard(products, category_id) if products else None
+    result = (category, bool(products), keyboard)
+    
+    if key not in _products_kb_cache and len(_products_kb_cache) >= _PRODUCTS_KB_CACHE_SIZE:
+        # Вытесняем самую старую запись
+        del _products_kb_cache[next(iter(_products_kb_cache))]
+    _products_kb_cache[key] = (time.monotonic() + PRODUCTS_KB_TTL, result)
+    return result
+
 class ProductViewer:
     """Класс для управления просмотром товаров"""
     
@@ -29,12 +84,11 @@ class ProductViewer:
         return product_view_state[user_id]
     
     @staticmethod
-    def update_image_index(user_id: int, product_id: int, delta: int) -> int:
+    def update_image_index(user_id: int, product_id: int, delta: int, images_count: int) -> int:
         """Обновляет индекс изображения и возвращает новое значение"""
         state = ProductViewer.get_current_state(user_id, product_id)
         if product_id not in state:
             state[product_id] = 0
-        images_count = len(db.get_product(product_id).get('image_urls', []))
         state[product_id] = (state[product_id] + delta) % images_count if images_count > 0 else 0
         return state[product_id]
     
@@ -49,7 +103,7 @@ async def knowledge_base_handler(
     context=None
 ) -> None:
     """Главный обработчик базы знаний"""
-    categories = db.get_categories()
+    categories = await _get_categories()
     if not categories:
         text = "В базе знаний пока нет категорий товаров."
         keyboard = None
@@ -77,24 +131,22 @@ async def category_handler(
     """Обработчик выбора категории"""
     await query.answer()
     category_id = int(query.data.split(':')[1])
-    products = db.get_products_by_category(category_id)
-    category = next(
-        (c for c in db.get_categories() if c['id'] == category_id),
-        {'name': 'Категория'}
-    )
+    category, has_products, keyboard = await _build_products_keyboard(category_id)
+    if not category:
+        category = {'name': 'Категория'}
     
-    if not products:
+    if not has_products:
         await safe_edit_message(
             message=query.message,
             text=f"📦 В категории \"{category['name']}\" пока нет товаров.",
-            reply_markup=get_back_to_categories_keyboard()
+            reply_markup=_BACK_TO_CATEGORIES_KB
         )
         return
     
     await safe_edit_message(
         message=query.message,
         text=f"📦 <b>{category['name']}</b>\n\nВыберите товар:",
-        reply_markup=get_products_keyboard(products, category_id)
+        reply_markup=keyboard
     )
 
 async def product_handler(
@@ -106,26 +158,27 @@ async def product_handler(
     user_id = query.from_user.id
     action, product_id = query.data.split(':')[:2]
     product_id = int(product_id)
-    product = db.get_product(product_id)
+    product = await _get_product(product_id)
     
     if not product:
         await safe_edit_message(
             message=query.message,
             text="⚠️ Товар не найден",
-            reply_markup=get_back_to_categories_keyboard()
+            reply_markup=_BACK_TO_CATEGORIES_KB
         )
         return
     
+    images = product.get('image_urls', [])
+    
     # Обработка навигации по изображениям
     if action == "product":
         ProductViewer.get_current_state(user_id, product_id)  # Инициализация
     elif action == "product_next":
-        ProductViewer.update_image_index(user_id, product_id, 1)
+        ProductViewer.update_image_index(user_id, product_id, 1, len(images))
     elif action == "product_prev":
-        ProductViewer.update_image_index(user_id, product_id, -1)
+        ProductViewer.update_image_index(user_id, product_id, -1, len(images))
     
     current_index = product_view_state[user_id][product_id]
-    images = product.get('image_urls', [])
     
     # Формирование информации о товаре
     text_parts = [
@@ -157,21 +210,24 @@ async def send_product_media(
     video_url = product.get('video_url')
     
     try:
-        if images:
-            if len(images) > 1:
-                # Для нескольких изображений используем медиагруппу
-                media_group = MediaGroupBuilder()
-                for img in images:
-                    media_group.add_photo(media=img)
-                await message.answer_media_group(media=media_group.build())
-            else:
-                # Для одного изображения
-                await message.answer_photo(
-                    photo=images[image_index],
-                    caption=f"Фото товара: {product['name']}"
+        if len(images) + bool(video_url) > 1:
+            # Фото и видео отправляются одной медиагруппой (один запрос к API)
+            media_group = MediaGroupBuilder()
+            for img in images:
+                media_group.add_photo(media=img)
+            if video_url:
+                media_group.add_video(
+                    media=video_url,
+                    caption=f"Видео о товаре: {product['name']}"
                 )
-        
-        if video_url:
+            await message.answer_media_group(media=media_group.build())
+        elif images:
+            # Для одного изображения
+            await message.answer_photo(
+                photo=images[image_index],
+                caption=f"Фото товара: {product['name']}"
+            )
+        elif video_url:
             await message.answer_video(
                 video=video_url,
                 caption=f"Видео о товаре: {product['name']}"
@@ -192,24 +248,24 @@ async def search_handler(
         )
         return
     
-    query_text = message.text[2:].strip()
+    query_text = message.text.removeprefix(_SEARCH_PREFIX).strip()
     if len(query_text) < MIN_SEARCH_LENGTH:
         await message.answer(
-            f"🔍 Поисковый запрос должен содержать минимум {MIN_SEARCH_LENGTH} символа",
-            reply_markup=get_back_to_categories_keyboard()
+            _SHORT_QUERY_MSG,
+            reply_markup=_BACK_TO_CATEGORIES_KB
         )
         return
     
-    products = db.search_products(query_text)[:MAX_SEARCH_RESULTS]
+    products = await _search_products(query_text, limit=MAX_SEARCH_RESULTS)
     
     if not products:
         await message.answer(
-            f"🔍 По запросу \"{query_text}\" ничего не найдено",
-            reply_markup=get_back_to_categories_keyboard()
+            _NOT_FOUND_MSG.format(query_text),
+            reply_markup=_BACK_TO_CATEGORIES_KB
         )
         return
     
-    response = [f"🔍 Результаты поиска \"{query_text}\":\n"]
+    response = [_RESULTS_HEADER.format(query_text)]
     buttons = []
     
     for idx, product in enumerate(products, 1):
@@ -221,12 +277,7 @@ async def search_handler(
             )
         ])
     
-    buttons.append([
-        types.InlineKeyboardButton(
-            text="🔙 К категориям",
-            callback_data="knowledge_base"
-        )
-    ])
+    buttons.append(_BACK_TO_CATEGORIES_ROW)
     
     await message.answer(
         "\n".join(response),
@@ -1,59 +1,227 @@
+import array
+import asyncio
 import logging
+import time
 from typing import Dict, Optional
 from aiogram import types
 from aiogram.types import CallbackQuery
 from aiogram.enums import ParseMode
 from sqlite_db import db  # Import the database instance
-from utils.keyboards import (
-    get_tests_keyboard,
-    get_test_question_keyboard,
-    get_test_result_keyboard,
-    get_back_to_tests_keyboard
-)
 from utils.message_utils import safe_edit_message
+from utils.batcher import AsyncBatcher
 
 logger = logging.getLogger(__name__)
 
-# Глобальный словарь для хранения текущих тестовых сессий пользователей
-user_test_sessions: Dict[int, Dict] = {}
+_HTML = ParseMode.HTML
+
+# Клавиатуры загружаются при первом обращении к тестам (см. _lazy_init),
+# чтобы не замедлять запуск бота, если тесты не используются
+_initialized = False
+get_tests_keyboard = None
+get_test_question_keyboard = None
+get_test_result_keyboard = None
+_BACK_TO_TESTS_KB = None
+
+def _lazy_init() -> None:
+    """Импортирует клавиатуры и создает статическую клавиатуру возврата"""
+    global _initialized, get_tests_keyboard, get_test_question_keyboard
+    global get_test_result_keyboard, _BACK_TO_TESTS_KB
+    if _initialized:
+        return
+    from utils import keyboards
+    get_tests_keyboard = keyboards.get_tests_keyboard
+    get_test_question_keyboard = keyboards.get_test_question_keyboard
+    get_test_result_keyboard = keyboards.get_test_result_keyboard
+    _BACK_TO_TESTS_KB = keyboards.get_back_to_tests_keyboard()
+    _initialized = True
+
+# Брошенные тестовые сессии истекают через SESSION_TTL секунд
+SESSION_TTL = 1800
+
+# Время жизни закэшированного теста, в секундах
+TEST_CACHE_TTL = 300
+
+class TestCache:
+    """Кэш тестов в памяти с TTL и объединением одновременных запросов"""
+    
+    def __init__(self, ttl: float = TEST_CACHE_TTL):
+        self._ttl = ttl
+        self._items: Dict[str, tuple] = {}  # {test_id: (expires_at, test)}
+        self._pending: Dict[str, asyncio.Future] = {}
+        self._lock = asyncio.Lock()
+    
+    async def get(self, test_id: str) -> Optional[Dict]:
+        """Возвращает тест из кэша или загружает его из БД один раз"""
+        key = str(test_id)
+        async with self._lock:
+            entry = self._items.get(key)
+            if entry and entry[0] > time.monotonic():
+                return entry[1]
+            future = self._pending.get(key)
+            if future is None:
+                future = asyncio.get_running_loop().create_future()
+                self._pending[key] = future
+                is_loader = True
+            else:
+                is_loader = False
+        
+        if not is_loader:
+            # Тот же тест уже загружается другим пользователем
+            return await asyncio.shield(future)
+        
+        test = None
+        try:
+            test = await db.get_test(test_id)
+            if test:
+                # Правильные ответы раскладываются в список один раз при загрузке
+                test['_correct'] = [q['correct_answer'] for q in test['questions']]
+                # Заголовки вопросов вида «Вопрос i/N» формируются заранее
+                total = len(test['questions'])
+                test['_qheader'] = [
+                    f"❓ <b>Вопрос {i}/{total}</b>\n\n" for i in range(1, total + 1)
+                ]
+        finally:
+            async with self._lock:
+                self._pending.pop(key, None)
+                if test:
+                    self._items[key] = (time.monotonic() + self._ttl, test)
+            future.set_result(test)
+        return test
+    
+    def invalidate(self, test_id: Optional[str] = None) -> None:
+        """Удаляет тест (или все тесты) из кэша"""
+        if test_id is None:
+            self._items.clear()
+        else:
+            self._items.pop(str(test_id), None)
+
+test_cache = TestCache()
+
+# Сколько раз повторяется сохранение попытки, прежде чем она попадет в лог
+ATTEMPT_MAX_RETRIES = 5
+
+class TestAttemptBatcher(AsyncBatcher):
+    """Объединяет сохранение попыток прохождения тестов в пакеты.
+    
+    Несохраненные попытки не теряются: они повторяются вместе со следующими
+    пакетами, а после ATTEMPT_MAX_RETRIES неудач записываются в лог целиком.
+    """
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._failed: list = []
+    
+    async def process_batch(self, items: list) -> None:
+        items = self._failed + items
+        self._failed = []
+        for attempt in await db.save_test_attempts(items):
+            attempt['_retries'] = attempt.get('_retries', 0) + 1
+            if attempt['_retries'] < ATTEMPT_MAX_RETRIES:
+                self._failed.append(attempt)
+            else:
+                logger.error(f"Dropping test attempt after {ATTEMPT_MAX_RETRIES} failed saves: {attempt!r}")
+        if self._failed:
+            logger.warning(f"{len(self._failed)} test attempts kept for retry")
+    
+    async def shutdown(self) -> None:
+        """Сохраняет очередь при остановке бота и логирует то, что не удалось сохранить"""
+        await self.flush()
+        async with self._lock:
+            if self._failed:
+                # Последняя попытка для отложенных записей
+                await self.process_batch([])
+        for attempt in self._failed:
+            logger.error(f"Test attempt not saved before shutdown: {attempt!r}")
+        self._failed = []
+
+attempt_batcher = TestAttemptBatcher(max_batch_size=400, max_queue_time=0.5)
+
+# Время жизни закэшированного списка тестов, в секундах
+TESTS_LIST_TTL = 60
+_tests_list_cache = {'expires': 0.0, 'value': None, 'lock': asyncio.Lock()}
+
+async def get_tests_list_cached() -> list:
+    """Возвращает список тестов, обращаясь к БД не чаще раза в TESTS_LIST_TTL"""
+    if time.monotonic() < _tests_list_cache['expires']:
+        return _tests_list_cache['value']
+    async with _tests_list_cache['lock']:
+        # Список мог обновить другой запрос, пока мы ждали блокировку
+        if time.monotonic() < _tests_list_cache['expires']:
+            return _tests_list_cache['value']
+        tests = await db.get_tests_list()
+        _tests_list_cache['value'] = tests
+        _tests_list_cache['expires'] = time.monotonic() + TESTS_LIST_TTL
+        return tests
+
+async def get_test_cached(test_id: str) -> Optional[Dict]:
+    """Возвращает тест с использованием кэша"""
+    return await test_cache.get(test_id)
 
 class TestSessionManager:
-    """Класс для управления тестовыми сессиями"""
+    """Класс для управления тестовыми сессиями.
+    
+    Сессии хранятся в таблице test_sessions, поэтому их видят все процессы
+    бота; ответы сохраняются в сжатом виде (массивы байтов).
+    """
     
     @staticmethod
-    def start_session(user_id: int, test_id: str) -> Dict:
+    async def start_session(user_id: int, test_id: str, test: Optional[Dict] = None) -> Dict:
         """Создает новую тестовую сессию"""
         # Ensure we have a clean state by removing any existing session
-        TestSessionManager.end_session(user_id)
+        await TestSessionManager.end_session(user_id)
         
-        # Create new session
-        user_test_sessions[user_id] = {
+        session = {
             'test_id': test_id,
+            'test': test,  # Тест хранится в сессии, чтобы не перечитывать его
+            # Значения, которые не меняются в течение сессии
+            'test_total': len(test['questions']) if test else 0,
+            'user_id_str': str(user_id),
             'current_question': 0,
-            'answers': [],
-            'score': 0,
-            'start_time': None  # Можно добавить время начала
+            # Ответы хранятся столбцами: номер вопроса — индекс в массиве
+            'answers': array.array('h'),  # выбранные варианты
+            'correct': bytearray(),  # 1 — ответ верный
+            'score': 0
         }
-        return user_test_sessions[user_id]
+        await TestSessionManager.save_session(session)
+        return session
     
     @staticmethod
-    def get_session(user_id: int) -> Optional[Dict]:
+    async def get_session(user_id: int) -> Optional[Dict]:
         """Возвращает текущую сессию пользователя"""
-        return user_test_sessions.get(user_id)
+        row = await db.get_test_session(user_id, time.time())
+        if row is None:
+            return None
+        answers = array.array('h')
+        answers.frombytes(row['answers'])
+        return {
+            'test_id': row['test_id'],
+            'test': await get_test_cached(row['test_id']),
+            'test_total': row['test_total'],
+            'user_id_str': str(user_id),
+            'current_question': row['current_question'],
+            'answers': answers,
+            'correct': bytearray(row['correct']),
+            'score': row['score']
+        }
     
     @staticmethod
-    def end_session(user_id: int) -> None:
+    async def save_session(session: Dict) -> None:
+        """Сохраняет сессию и продлевает срок ее действия"""
+        await db.save_test_session(session, time.time() + SESSION_TTL)
+    
+    @staticmethod
+    async def end_session(user_id: int) -> None:
         """Завершает сессию пользователя"""
-        if user_id in user_test_sessions:
-            user_test_sessions.pop(user_id, None)  # Safely remove the session
+        await db.delete_test_session(user_id, time.time())
 
 async def testing_handler(
     update: types.Message | types.CallbackQuery,
     context=None
 ) -> None:
     """Главный обработчик системы тестирования"""
+    _lazy_init()
     try:
-        tests = db.get_tests_list()  # Use db instance
+        tests = await get_tests_list_cached()
         if not tests:
             await handle_no_tests(update)
             return
@@ -62,12 +230,15 @@ async def testing_handler(
         keyboard = get_tests_keyboard(tests)
         
         if isinstance(update, types.CallbackQuery):
-            await safe_edit_message(
-                message=update.message,
-                text=text,
-                reply_markup=keyboard
+            # Ответ на callback и редактирование сообщения независимы
+            await asyncio.gather(
+                update.answer(),
+                safe_edit_message(
+                    message=update.message,
+                    text=text,
+                    reply_markup=keyboard
+                )
             )
-            await update.answer()
         else:
             await update.answer(
                 text=text,
@@ -83,41 +254,47 @@ async def test_selection_handler(
     context=None
 ) -> None:
     """Обработчик выбора теста"""
-    await query.answer()
-    test_id = query.data.split(':')[1]
-    test = db.get_test(test_id)  # Use db instance
+    _lazy_init()
+    test_id = query.data.partition(':')[2]
+    test = await get_test_cached(test_id)
     
     if not test:
-        await safe_edit_message(
-            message=query.message,
-            text="⚠️ Тест не найден",
-            reply_markup=get_back_to_tests_keyboard()
+        await asyncio.gather(
+            query.answer(),
+            safe_edit_message(
+                message=query.message,
+                text="⚠️ Тест не найден",
+                reply_markup=_BACK_TO_TESTS_KB
+            )
         )
         return
     
     # Инициализируем сессию
-    session = TestSessionManager.start_session(query.from_user.id, test_id)
+    session = await TestSessionManager.start_session(query.from_user.id, test_id, test)
     
     # Формируем информацию о тесте
     test_info = [
         f"📚 <b>{test['title']}</b>",
         f"\n\n{test.get('description', '')}",
-        f"\n\n🔢 Количество вопросов: {len(test['questions'])}",
+        f"\n\n🔢 Количество вопросов: {session['test_total']}",
         f"\n📊 Проходной балл: {test['passing_score']}%",
         "\n\nНажмите кнопку ниже, чтобы начать тестирование."
     ]
     
-    await safe_edit_message(
-        message=query.message,
-        text="".join(test_info),
-        parse_mode=ParseMode.HTML,
-        reply_markup=types.InlineKeyboardMarkup(
-            inline_keyboard=[[
-                types.InlineKeyboardButton(
-                    text="▶️ Начать тест",
-                    callback_data=f"test_question:{test_id}:start"
-                )
-            ]]
+    await asyncio.gather(
+        query.answer(),
+        safe_edit_message(
+            message=query.message,
+            text="".join(test_info),
+            parse_mode=_HTML,
+            reply_markup=types.InlineKeyboardMarkup(
+                inline_keyboard=[[
+                    types.InlineKeyboardButton(
+                        text="▶️ Начать тест",
+                        callback_data=f"test_question:{test_id}:start"
+                    )
+                ]]
+            )
         )
     )
 
@@ -126,61 +303,76 @@ async def test_question_handler(
     context=None
 ) -> None:
     """Обработчик вопросов теста"""
-    await query.answer()
+    _lazy_init()
     user_id = query.from_user.id
-    parts = query.data.split(':')
-    test_id = parts[1]
-    action = parts[2]
+    # Формат: test_question:{test_id}:{action}
+    test_id = query.data.partition(':')[2].partition(':')[0]
     
-    session = TestSessionManager.get_session(user_id)
+    session = await TestSessionManager.get_session(user_id)
     if not session or session['test_id'] != test_id:
-        await handle_session_expired(query)
+        await asyncio.gather(query.answer(), handle_session_expired(query))
         return
     
-    test = db.get_test(test_id)  # Use db instance
+    test = session.get('test') or await get_test_cached(test_id)
     if not test:
-        await handle_test_not_found(query)
+        await asyncio.gather(query.answer(), handle_test_not_found(query))
         return
     
-    # Обработка ответа пользователя
+    await asyncio.gather(query.answer(), _show_question(query, session, test))
+
 async def test_answer_handler(query: CallbackQuery):
+    """Обработчик ответа на вопрос теста"""
+    _lazy_init()
     _, test_id, question_idx, answer_idx = query.data.split(':')
-    session = TestSessionManager.get_session(query.from_user.id)
+    session = await TestSessionManager.get_session(query.from_user.id)
     if not session:
         await query.answer("Сессия истекла")
         return
-    
-    question = get_question(test_id, question_idx)
-    if not question:
+
+    # Повторное нажатие или кнопка из старого сообщения не должны
+    # засчитываться как ответ на текущий вопрос
+    question_idx = int(question_idx)
+    if session['test_id'] != test_id or question_idx != session['current_question']:
+        await query.answer("Этот вопрос уже неактуален")
+        return
+
+    test = session.get('test') or await get_test_cached(test_id)
+    if not test or not 0 <= question_idx < len(test['_correct']):
         await query.answer("Вопрос не найден")
         return
     
-    session['answers'].append({
-        'question_idx': question_idx,
-        'answer_idx': answer_idx,
-        'is_correct': answer_idx == question['correct']
-    })
+    answer_idx = int(answer_idx)
+    is_correct = answer_idx == test['_correct'][question_idx]
+    session['answers'].append(answer_idx)
+    session['correct'].append(is_correct)
+    session['score'] += is_correct  # bool: True → 1, False → 0
+    session['current_question'] += 1
     
     # Проверка завершения теста
-    if session['current_question'] >= len(test['questions']):
+    if session['current_question'] >= session['test_total']:
         await finish_test_session(query, session, test)
         return
     
-    # Отображение текущего вопроса
-    question = test['questions'][session['current_question']]
-    question_text = (
-        f"❓ <b>Вопрос {session['current_question']+1}/{len(test['questions'])}</b>\n\n"
-        f"{question['text']}"
-    )
+    await TestSessionManager.save_session(session)
+    await _show_question(query, session, test)
+
+async def _show_question(
+    query: types.CallbackQuery,
+    session: Dict,
+    test: Dict
+) -> None:
+    """Отображает текущий вопрос сессии"""
+    idx = session['current_question']
+    question = test['questions'][idx]
     
     await safe_edit_message(
         message=query.message,
-        text=question_text,
-        parse_mode=ParseMode.HTML,
+        text=test['_qheader'][idx] + question['text'],
+        parse_mode=_HTML,
         reply_markup=get_test_question_keyboard(
             session['current_question'],
             question['options'],
-            test_id
+            session['test_id']
         )
     )
 
@@ -189,21 +381,40 @@ async def test_result_handler(
     context=None
 ) -> None:
     """Обработчик результатов теста"""
-    await query.answer()
+    _lazy_init()
     user_id = query.from_user.id
-    session = TestSessionManager.get_session(user_id)
+    session = await TestSessionManager.get_session(user_id)
     
     if not session:
-        await handle_session_expired(query)
+        await asyncio.gather(query.answer(), handle_session_expired(query))
         return
     
-    test = db.get_test(session['test_id'])
+    test = session.get('test') or await get_test_cached(session['test_id'])
     if not test:
-        await handle_test_not_found(query)
+        await asyncio.gather(query.answer(), handle_test_not_found(query))
         return
     
+    text, keyboard = await _render_result(user_id, session, test)
+    await TestSessionManager.end_session(user_id)
+    
+    await asyncio.gather(
+        query.answer(),
+        safe_edit_message(
+            message=query.message,
+            text=text,
+            parse_mode=_HTML,
+            reply_markup=keyboard
+        )
+    )
+
+async def _render_result(
+    user_id: int,
+    session: Dict,
+    test: Dict
+) -> tuple[str, types.InlineKeyboardMarkup]:
+    """Формирует текст и клавиатуру с результатами теста"""
     score = session['score']
-    max_score = len(test['questions'])
+    max_score = session['test_total']
     percentage = (score / max_score) * 100
     passed = percentage >= test['passing_score']
     
@@ -214,25 +425,18 @@ async def test_result_handler(
         "\n\n🎉 <b>Тест пройден!</b>" if passed else "\n\n❌ <b>Тест не пройден</b>"
     ]
     
-    # Показ истории попыток
-    attempts = get_test_attempts(user_id, session['test_id'])
+    # Показ истории попыток (последние 3)
+    attempts = await db.get_test_attempts(user_id, session['test_id'], limit=3)
     if attempts:
         result_text.append("\n\n📅 Ваши предыдущие попытки:")
-        for idx, attempt in enumerate(attempts[:3], 1):  # Показываем последние 3 попытки
+        for idx, attempt in enumerate(attempts, 1):
             attempt_percent = (attempt['score'] / attempt['max_score']) * 100
             result_text.append(
                 f"\n{idx}. {attempt['score']}/{attempt['max_score']} ({attempt_percent:.1f}%) - "
                 f"{'✅' if attempt_percent >= test['passing_score'] else '❌'}"
             )
     
-    TestSessionManager.end_session(user_id)
-    
-    await safe_edit_message(
-        message=query.message,
-        text="".join(result_text),
-        parse_mode=ParseMode.HTML,
-        reply_markup=get_test_result_keyboard(test_id, passed)
-    )
+    return "".join(result_text), get_test_result_keyboard(session['test_id'], passed)
 
 async def finish_test_session(
     query: types.CallbackQuery,
@@ -241,34 +445,38 @@ async def finish_test_session(
 ) -> None:
     """Завершает тестовую сессию и сохраняет результаты"""
     attempt_data = {
-        'user_id': str(query.from_user.id),
+        'user_id': session['user_id_str'],
         'test_id': session['test_id'],
         'score': session['score'],
-        'max_score': len(test['questions']),
-        'answers': session['answers'],
+        'max_score': session['test_total'],
         'completed': True
     }
     
-    if not save_test_attempt(attempt_data):
-        logger.error(f"Failed to save test attempt for user {query.from_user.id}")
+    await attempt_batcher.submit(attempt_data)
+    
+    # Результат отправляется одним редактированием сообщения
+    text, keyboard = await _render_result(query.from_user.id, session, test)
+    await TestSessionManager.end_session(query.from_user.id)
     
     await safe_edit_message(
         message=query.message,
-        text="📝 Подсчет результатов...",
-        reply_markup=None
+        text=text,
+        parse_mode=_HTML,
+        reply_markup=keyboard
     )
-    await test_result_handler(query)
 
 async def handle_no_tests(target: types.Message | types.CallbackQuery) -> None:
     """Обработчик отсутствия тестов"""
     text = "ℹ️ В данный момент нет доступных тестов."
     if isinstance(target, types.CallbackQuery):
-        await safe_edit_message(
-            message=target.message,
-            text=text,
-            reply_markup=get_back_to_tests_keyboard()
+        await asyncio.gather(
+            target.answer(),
+            safe_edit_message(
+                message=target.message,
+                text=text,
+                reply_markup=_BACK_TO_TESTS_KB
+            )
         )
-        await target.answer()
     else:
         await target.answer(text)
 
@@ -277,7 +485,7 @@ async def handle_session_expired(query: types.CallbackQuery) -> None:
     await safe_edit_message(
         message=query.message,
         text="⚠️ Ваша тестовая сессия истекла. Пожалуйста, начните заново.",
-        reply_markup=get_back_to_tests_keyboard()
+        reply_markup=_BACK_TO_TESTS_KB
     )
 
 async def handle_test_not_found(query: types.CallbackQuery) -> None:
@@ -285,18 +493,20 @@ async def handle_test_not_found(query: types.CallbackQuery) -> None:
     await safe_edit_message(
         message=query.message,
         text="⚠️ Тест не найден. Возможно, он был удален.",
-        reply_markup=get_back_to_tests_keyboard()
+        reply_markup=_BACK_TO_TESTS_KB
     )
 
 async def handle_error(target: types.Message | types.CallbackQuery) -> None:
     """Обработчик ошибок"""
     text = "⚠️ Произошла ошибка при обработке теста. Пожалуйста, попробуйте позже."
     if isinstance(target, types.CallbackQuery):
-        await safe_edit_message(
-            message=target.message,
-            text=text,
-            reply_markup=get_back_to_tests_keyboard()
+        await asyncio.gather(
+            target.answer(),
+            safe_edit_message(
+                message=target.message,
+                text=text,
+                reply_markup=_BACK_TO_TESTS_KB
+            )
         )
-        await target.answer()
     else:
         await target.answer(text)
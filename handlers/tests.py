@@ -1,6 +1,10 @@
 """Test handlers for managing and taking tests."""
 
+import asyncio
+import json
 import logging
+from collections import defaultdict
+from functools import lru_cache
 from typing import Optional, Dict, List
 from datetime import datetime, timedelta
 
@@ -17,11 +21,104 @@ from utils.keyboards import (
     get_pagination_keyboard
 )
 from monitoring.metrics import metrics_collector
+from sqlite_db import db
 from config import ADMIN_IDS
+from utils.cache_versions import get_tests_version
 
 router = Router()
+# Callbacks outside these prefixes skip the whole router
+router.callback_query.filter(
+    F.data.startswith(("tests_page_", "test_", "start_test_", "back_to_tests"))
+)
 logger = logging.getLogger(__name__)
 
+# Static keyboards are built once at import time
+_BACK_KB = get_back_keyboard()
+
+@lru_cache(maxsize=512)
+def _test_kb(test_id: int, is_admin: bool = False):
+    """Cached test view keyboard."""
+    return get_test_keyboard(test_id, is_admin=is_admin)
+
+@lru_cache(maxsize=512)
+def _pagination_kb(current_page: int, total_pages: int, prefix: str):
+    """Cached pagination keyboard."""
+    return get_pagination_keyboard(current_page, total_pages, prefix)
+
+# Rendered tests list pages, reused while the tests catalog version
+# from utils.cache_versions is unchanged
+_tests_cache = {"version": None, "total_pages": None, "pages": {}}
+
+# Number of tests shown on one page of the tests list
+TESTS_PER_PAGE = 5
+# Most rendered pages kept per tests catalog version
+TESTS_CACHE_MAX_PAGES = 64
+
+# Queries on the test-taking path, kept as constants so every call
+# reuses the same prepared statement from the connection's cache
+_SQL_GET_TEST = """
+    SELECT id, title, passing_score
+    FROM tests
+    WHERE id = ? AND is_active = 1
+"""
+_SQL_GET_TESTS_PAGE = """
+    SELECT t.title, t.description, t.time_limit, t.passing_score,
+           c.name as category_name,
+           COUNT(*) OVER () as total_count
+    FROM tests t
+    LEFT JOIN categories c ON t.category_id = c.id
+    WHERE t.is_active = 1
+    ORDER BY c.order_num, c.name, t.title
+    LIMIT ? OFFSET ?
+"""
+_SQL_GET_QUESTIONS = """
+    SELECT id, question_text, question_type, options, correct_answer, points
+    FROM test_questions
+    WHERE test_id = ?
+    ORDER BY id
+"""
+_SQL_GET_TEST_DETAILS = """
+    SELECT t.*, c.name as category_name
+    FROM tests t
+    LEFT JOIN categories c ON t.category_id = c.id
+    WHERE t.id = ? AND t.is_active = 1
+"""
+# test_attempts.user_id is users.id; handlers know the Telegram ID
+_SQL_LAST_ATTEMPT = """
+    SELECT a.score, a.max_score, a.started_at
+    FROM test_attempts a
+    JOIN users u ON u.id = a.user_id
+    WHERE u.telegram_id = ? AND a.test_id = ? AND a.is_completed = 1
+    ORDER BY a.started_at DESC
+    LIMIT 1
+"""
+# Inserts nothing if the user has not been registered yet
+_SQL_INSERT_ATTEMPT = """
+    INSERT INTO test_attempts (user_id, test_id, max_score)
+    SELECT id, ?, ? FROM users WHERE telegram_id = ?
+"""
+_SQL_INSERT_ANSWER = """
+    INSERT INTO user_answers (
+        attempt_id, question_id, answer, is_correct, points
+    ) VALUES (?, ?, ?, ?, ?)
+"""
+# Score of a finished attempt in a single round-trip
+_SQL_ATTEMPT_TOTALS = """
+    SELECT
+        (SELECT COALESCE(SUM(points), 0) FROM user_answers
+         WHERE attempt_id = a.id) AS score,
+        a.max_score,
+        t.passing_score
+    FROM test_attempts a
+    JOIN tests t ON t.id = a.test_id
+    WHERE a.id = ?
+"""
+_SQL_COMPLETE_ATTEMPT = """
+    UPDATE test_attempts
+    SET score = ?, is_completed = 1, completed_at = CURRENT_TIMESTAMP
+    WHERE id = ?
+"""
+
 class TestStates(StatesGroup):
     """States for test interactions."""
     browsing_tests = State()
@@ -29,67 +126,55 @@ class TestStates(StatesGroup):
     answering_question = State()
     waiting_for_retry = State()
 
+def prepare_question(row) -> Dict:
+    """Convert a question row to a dict with its JSON columns parsed once.
+    
+    Choice questions ('single', 'multiple') get an ``options`` list and
+    ``correct`` set of 0-based indexes of the correct options; text
+    questions get the expected ``correct`` answer in lower case.
+    """
+    question = dict(row)
+    correct = json.loads(question.pop('correct_answer'))
+    if question['question_type'] == 'text':
+        question['correct'] = str(correct).strip().lower()
+    else:
+        question['options'] = json.loads(question['options'] or '[]')
+        question['correct'] = correct if isinstance(correct, list) else [correct]
+    return question
+
+def format_question(question: Dict, number: int) -> str:
+    """Format a prepared test question with its options."""
+    parts = [
+        f"📝 Вопрос {number}:\n\n",
+        f"{question['question_text']}\n\n"
+    ]
+    
+    if question['question_type'] != 'text':
+        parts.extend(
+            f"{i}. {option}\n"
+            for i, option in enumerate(question['options'], 1)
+        )
+    
+    return "".join(parts)
+
 @router.message(Command("tests"))
 @router.message(F.text == "📝 Тесты")
 async def show_tests(message: Message, state: FSMContext):
     """Show available tests."""
     try:
-        # Get available tests
-        tests = await db_pool.fetchall(
-            """
-            SELECT t.*, p.name as product_name, c.name as category_name
-            FROM tests t
-            JOIN products p ON t.product_id = p.id
-            JOIN categories c ON p.category_id = c.id
-            WHERE t.is_active = 1
-            ORDER BY c.name, p.name, t.name
-            """
-        )
+        _, tests_text, total_pages = await _get_tests_page(1)
         
-        if not tests:
+        if tests_text is None:
             await message.answer(
                 "😔 Доступных тестов пока нет.",
-                reply_markup=get_back_keyboard()
+                reply_markup=_BACK_KB
             )
             return
         
-        # Group tests by category and product
-        tests_by_category = {}
-        for test in tests:
-            category = test['category_name']
-            product = test['product_name']
-            
-            if category not in tests_by_category:
-                tests_by_category[category] = {}
-            if product not in tests_by_category[category]:
-                tests_by_category[category][product] = []
-            
-            tests_by_category[category][product].append(test)
-        
-        # Format tests message
-        tests_text = "📝 Доступные тесты:\n\n"
-        for category, products in tests_by_category.items():
-            tests_text += f"📚 {category}\n"
-            for product, product_tests in products.items():
-                tests_text += f"\n📦 {product}:\n"
-                for test in product_tests:
-                    tests_text += f"• {test['name']}\n"
-                    if test['description']:
-                        tests_text += f"  {test['description']}\n"
-                    if test['time_limit']:
-                        tests_text += f"  ⏱ {test['time_limit']} мин.\n"
-                    if test['passing_score']:
-                        tests_text += f"  ✅ Проходной балл: {test['passing_score']}%\n"
-        
-        # Add pagination if needed
-        page = 1
-        items_per_page = 5
-        total_pages = (len(tests) + items_per_page - 1) // items_per_page
-        
         await message.answer(
             tests_text,
-            reply_markup=get_pagination_keyboard(
-                page,
+            reply_markup=_pagination_kb(
+                1,
                 total_pages,
                 "tests"
             )
@@ -103,8 +188,101 @@ async def show_tests(message: Message, state: FSMContext):
         logger.error(f"Error showing tests: {e}")
         await message.answer(
             "😔 Произошла ошибка при загрузке тестов. Попробуйте позже.",
-            reply_markup=get_back_keyboard()
+            reply_markup=_BACK_KB
+        )
+
+@router.callback_query(F.data.startswith("tests_page_"))
+async def show_tests_page(callback: CallbackQuery, state: FSMContext):
+    """Show another page of the tests list."""
+    try:
+        page = int(callback.data.rpartition("_")[2])
+        page, tests_text, total_pages = await _get_tests_page(page)
+        
+        if tests_text is None:
+            await callback.answer("Страница не найдена")
+            return
+        
+        await callback.message.edit_text(
+            tests_text,
+            reply_markup=_pagination_kb(
+                page,
+                total_pages,
+                "tests"
+            )
         )
+        await callback.answer()
+        
+    except Exception as e:
+        logger.error(f"Error showing tests page: {e}")
+        await callback.answer("😔 Произошла ошибка при загрузке тестов.")
+
+async def _get_tests_page(page: int) -> tuple[int, Optional[str], int]:
+    """Return a rendered tests list page, memoized per tests catalog version.
+    
+    The requested page comes from callback data and is clamped to
+    1..total_pages before the lookup.
+    
+    Returns:
+        The page actually shown, its text (None if there are no tests)
+        and the page count
+    """
+    version = get_tests_version()
+    if _tests_cache["version"] != version:
+        _tests_cache["version"] = version
+        _tests_cache["total_pages"] = None
+        _tests_cache["pages"] = {}
+    pages = _tests_cache["pages"]
+    if _tests_cache["total_pages"] is None:
+        # The first page carries the page count used for clamping
+        pages[1] = await _load_tests_page(1)
+        _tests_cache["total_pages"] = pages[1][1]
+    page = min(max(page, 1), max(_tests_cache["total_pages"], 1))
+    payload = pages.get(page)
+    if payload is None:
+        if len(pages) >= TESTS_CACHE_MAX_PAGES:
+            # Evict the oldest rendered page
+            del pages[next(iter(pages))]
+        payload = await _load_tests_page(page)
+        pages[page] = payload
+    return (page, *payload)
+
+async def _load_tests_page(page: int) -> tuple[Optional[str], int]:
+    """Query one page of available tests and render the tests list message.
+    
+    Returns:
+        The rendered text (None if the page is empty) and the page count
+    """
+    # Fetch only the requested page; the window count carries the total
+    # number of active tests so no separate COUNT query is needed
+    tests_by_category = defaultdict(list)
+    tests_count = 0
+    async for test in db.pool.fetchmany_iter(
+        _SQL_GET_TESTS_PAGE,
+        (TESTS_PER_PAGE, (page - 1) * TESTS_PER_PAGE)
+    ):
+        tests_by_category[test['category_name'] or "Без категории"].append(test)
+        tests_count = test['total_count']
+    
+    if not tests_count:
+        return None, 0
+    
+    # Format tests message
+    tests_parts = ["📝 Доступные тесты:\n\n"]
+    for category, category_tests in tests_by_category.items():
+        tests_parts.append(f"📚 {category}\n")
+        for test in category_tests:
+            tests_parts.append(f"• {test['title']}\n")
+            if test['description']:
+                tests_parts.append(f"  {test['description']}\n")
+            if test['time_limit']:
+                tests_parts.append(f"  ⏱ {test['time_limit']} мин.\n")
+            if test['passing_score']:
+                tests_parts.append(f"  ✅ Проходной балл: {test['passing_score']}%\n")
+    tests_text = "".join(tests_parts)
+    
+    total_pages = (tests_count + TESTS_PER_PAGE - 1) // TESTS_PER_PAGE
+    
+    return tests_text, total_pages
 
 @router.callback_query(F.data.startswith("test_"))
 async def show_test_details(callback: CallbackQuery, state: FSMContext):
@@ -113,59 +291,42 @@ async def show_test_details(callback: CallbackQuery, state: FSMContext):
         test_id = int(callback.data.split("_")[1])
         is_admin = callback.from_user.id in ADMIN_IDS
         
-        # Get test info
-        test = await db_pool.fetchone(
-            """
-            SELECT t.*, p.name as product_name, c.name as category_name
-            FROM tests t
-            JOIN products p ON t.product_id = p.id
-            JOIN categories c ON p.category_id = c.id
-            WHERE t.id = ? AND t.is_active = 1
-            """,
-            (test_id,)
+        # Get test info and the user's last attempt concurrently; the two
+        # queries are independent and run on separate pool connections
+        test, last_attempt = await asyncio.gather(
+            db.pool.fetchone(_SQL_GET_TEST_DETAILS, (test_id,)),
+            db.pool.fetchone(_SQL_LAST_ATTEMPT, (callback.from_user.id, test_id))
         )
         
         if not test:
             await callback.answer("Тест не найден")
             return
         
-        # Check if user has already taken this test
-        last_attempt = await db_pool.fetchone(
-            """
-            SELECT score, created_at
-            FROM test_attempts
-            WHERE user_id = ? AND test_id = ?
-            ORDER BY created_at DESC
-            LIMIT 1
-            """,
-            (callback.from_user.id, test_id)
-        )
-        
         # Format test message
-        test_text = f"📝 {test['name']}\n"
-        test_text += f"📚 Категория: {test['category_name']}\n"
-        test_text += f"📦 Товар: {test['product_name']}\n"
+        test_parts = [f"📝 {test['title']}\n"]
+        
+        if test['category_name']:
+            test_parts.append(f"📚 Категория: {test['category_name']}\n")
         
         if test['description']:
-            test_text += f"\n📋 Описание:\n{test['description']}\n"
+            test_parts.append(f"\n📋 Описание:\n{test['description']}\n")
         
         if test['time_limit']:
-            test_text += f"\n⏱ Время на прохождение: {test['time_limit']} мин.\n"
+            test_parts.append(f"\n⏱ Время на прохождение: {test['time_limit']} мин.\n")
         
         if test['passing_score']:
-            test_text += f"✅ Проходной балл: {test['passing_score']}%\n"
-        
-        if test['max_attempts']:
-            test_text += f"🔄 Максимум попыток: {test['max_attempts']}\n"
+            test_parts.append(f"✅ Проходной балл: {test['passing_score']}%\n")
         
         if last_attempt:
-            test_text += f"\n📊 Последняя попытка:\n"
-            test_text += f"• Результат: {last_attempt['score']}%\n"
-            test_text += f"• Дата: {last_attempt['created_at']}\n"
+            test_parts.append(
+                f"\n📊 Последняя попытка:\n"
+                f"• Результат: {last_attempt['score'] / last_attempt['max_score'] * 100:.1f}%\n"
+                f"• Дата: {last_attempt['started_at']}\n"
+            )
         
         await callback.message.edit_text(
-            test_text,
-            reply_markup=get_test_keyboard(
+            "".join(test_parts),
+            reply_markup=_test_kb(
                 test_id,
                 is_admin=is_admin
             )
@@ -182,7 +343,7 @@ async def show_test_details(callback: CallbackQuery, state: FSMContext):
         logger.error(f"Error showing test details: {e}")
         await callback.message.edit_text(
             "😔 Произошла ошибка при загрузке теста. Попробуйте позже.",
-            reply_markup=get_back_keyboard()
+            reply_markup=_BACK_KB
         )
 
 @router.callback_query(F.data.startswith("start_test_"))
@@ -191,79 +352,41 @@ async def start_test(callback: CallbackQuery, state: FSMContext):
     try:
         test_id = int(callback.data.split("_")[2])
         
-        # Get test info
-        test = await db_pool.fetchone(
-            """
-            SELECT t.*, p.name as product_name
-            FROM tests t
-            JOIN products p ON t.product_id = p.id
-            WHERE t.id = ? AND t.is_active = 1
-            """,
-            (test_id,)
+        # Get test info and all questions concurrently. Questions are
+        # prefetched so answering needs no per-question query.
+        test, question_rows = await asyncio.gather(
+            db.pool.fetchone(_SQL_GET_TEST, (test_id,)),
+            db.pool.fetchall(_SQL_GET_QUESTIONS, (test_id,))
         )
         
         if not test:
             await callback.answer("Тест не найден")
             return
         
-        # Check if user has exceeded max attempts
-        if test['max_attempts']:
-            attempts_count = await db_pool.fetchone(
-                """
-                SELECT COUNT(*) as count
-                FROM test_attempts
-                WHERE user_id = ? AND test_id = ?
-                """,
-                (callback.from_user.id, test_id)
-            )
-            
-            if attempts_count['count'] >= test['max_attempts']:
-                await callback.message.edit_text(
-                    "❌ Вы исчерпали все попытки прохождения этого теста.",
-                    reply_markup=get_back_keyboard()
-                )
-                return
+        questions = [prepare_question(row) for row in question_rows]
         
-        # Get first question
-        question = await db_pool.fetchone(
-            """
-            SELECT *
-            FROM test_questions
-            WHERE test_id = ?
-            ORDER BY question_order
-            LIMIT 1
-            """,
-            (test_id,)
-        )
-        
-        if not question:
+        if not questions:
             await callback.message.edit_text(
                 "❌ В тесте нет вопросов.",
-                reply_markup=get_back_keyboard()
+                reply_markup=_BACK_KB
             )
             return
         
-        # Start test attempt
-        attempt_id = await db_pool.execute(
-            """
-            INSERT INTO test_attempts (user_id, test_id, started_at)
-            VALUES (?, ?, ?)
-            """,
-            (callback.from_user.id, test_id, datetime.now())
+        # Start test attempt; the maximum score is the sum of question points
+        attempt_id = await db.pool.execute(
+            _SQL_INSERT_ATTEMPT,
+            (test_id, sum(q['points'] for q in questions), callback.from_user.id)
         )
-        
-        # Format question message
-        question_text = f"📝 Вопрос {question['question_order']}:\n\n"
-        question_text += f"{question['question_text']}\n\n"
-        
-        if question['question_type'] == 'multiple_choice':
-            options = question['options'].split('|')
-            for i, option in enumerate(options, 1):
-                question_text += f"{i}. {option}\n"
+        if attempt_id is None:
+            await callback.message.edit_text(
+                "❌ Сначала зарегистрируйтесь командой /start.",
+                reply_markup=_BACK_KB
+            )
+            return
         
         await callback.message.edit_text(
-            question_text,
-            reply_markup=get_back_keyboard()
+            format_question(questions[0], 1),
+            reply_markup=_BACK_KB
         )
         
         # Update state
@@ -271,8 +394,8 @@ async def start_test(callback: CallbackQuery, state: FSMContext):
         await state.update_data(
             current_test=test_id,
             current_attempt=attempt_id,
-            current_question=question['id'],
-            question_order=question['question_order']
+            questions=questions,
+            question_idx=0
         )
         
         # Track metrics
@@ -282,7 +405,7 @@ async def start_test(callback: CallbackQuery, state: FSMContext):
         logger.error(f"Error starting test: {e}")
         await callback.message.edit_text(
             "😔 Произошла ошибка при запуске теста. Попробуйте позже.",
-            reply_markup=get_back_keyboard()
+            reply_markup=_BACK_KB
         )
 
 @router.message(TestStates.answering_question)
@@ -291,126 +414,78 @@ async def process_answer(message: Message, state: FSMContext):
     try:
         # Get current test state
         state_data = await state.get_data()
-        test_id = state_data['current_test']
         attempt_id = state_data['current_attempt']
-        current_question_id = state_data['current_question']
-        question_order = state_data['question_order']
-        
-        # Get current question
-        question = await db_pool.fetchone(
-            "SELECT * FROM test_questions WHERE id = ?",
-            (current_question_id,)
-        )
+        questions = state_data['questions']
+        question_idx = state_data['question_idx']
+        question = questions[question_idx]
         
         # Process answer
-        answer = message.text.strip()
+        text = message.text
+        answer = text.strip() if text else ""
         is_correct = False
         
-        if question['question_type'] == 'multiple_choice':
-            try:
-                answer_index = int(answer) - 1
-                options = question['options'].split('|')
-                if 0 <= answer_index < len(options):
-                    is_correct = options[answer_index] == question['correct_answer']
-            except ValueError:
+        if question['question_type'] == 'text':
+            is_correct = answer.lower() == question['correct']
+        else:
+            # Option numbers are 1-based and may be separated by commas or
+            # spaces; isdecimal() accepts exactly the strings int() can parse
+            # as a plain number, so no exception handling is needed here
+            numbers = answer.replace(",", " ").split()
+            single = question['question_type'] == 'single'
+            if not numbers or not all(n.isdecimal() for n in numbers) or (single and len(numbers) > 1):
                 await message.answer(
-                    "❌ Пожалуйста, введите номер правильного варианта ответа.",
-                    reply_markup=get_back_keyboard()
+                    "❌ Пожалуйста, введите номер правильного варианта ответа."
+                    if single else
+                    "❌ Пожалуйста, введите номера правильных вариантов через запятую.",
+                    reply_markup=_BACK_KB
                 )
                 return
-        else:
-            is_correct = answer.lower() == question['correct_answer'].lower()
-        
-        # Save answer
-        await db_pool.execute(
-            """
-            INSERT INTO test_answers (
-                attempt_id, question_id, user_answer, is_correct
-            ) VALUES (?, ?, ?, ?)
-            """,
-            (attempt_id, current_question_id, answer, is_correct)
-        )
-        
-        # Get next question
-        next_question = await db_pool.fetchone(
-            """
-            SELECT *
-            FROM test_questions
-            WHERE test_id = ? AND question_order > ?
-            ORDER BY question_order
-            LIMIT 1
-            """,
-            (test_id, question_order)
+            is_correct = {int(n) - 1 for n in numbers} == set(question['correct'])
+        
+        # Save answer; the answer column holds JSON
+        await db.pool.execute(
+            _SQL_INSERT_ANSWER,
+            (
+                attempt_id,
+                question['id'],
+                json.dumps(answer, ensure_ascii=False),
+                is_correct,
+                question['points'] if is_correct else 0
+            )
         )
         
-        if next_question:
+        question_idx += 1
+        if question_idx < len(questions):
             # Show next question
-            question_text = f"📝 Вопрос {next_question['question_order']}:\n\n"
-            question_text += f"{next_question['question_text']}\n\n"
-            
-            if next_question['question_type'] == 'multiple_choice':
-                options = next_question['options'].split('|')
-                for i, option in enumerate(options, 1):
-                    question_text += f"{i}. {option}\n"
-            
             await message.answer(
-                question_text,
-                reply_markup=get_back_keyboard()
+                format_question(questions[question_idx], question_idx + 1),
+                reply_markup=_BACK_KB
             )
             
             # Update state
-            await state.update_data(
-                current_question=next_question['id'],
-                question_order=next_question['question_order']
-            )
+            await state.update_data(question_idx=question_idx)
             
         else:
-            # Test completed, calculate score
-            total_questions = await db_pool.fetchone(
-                "SELECT COUNT(*) as count FROM test_questions WHERE test_id = ?",
-                (test_id,)
-            )
-            
-            correct_answers = await db_pool.fetchone(
-                """
-                SELECT COUNT(*) as count
-                FROM test_answers
-                WHERE attempt_id = ? AND is_correct = 1
-                """,
-                (attempt_id,)
-            )
-            
-            score = (correct_answers['count'] / total_questions['count']) * 100
-            
-            # Update attempt with score
-            await db_pool.execute(
-                """
-                UPDATE test_attempts
-                SET completed_at = ?, score = ?
-                WHERE id = ?
-                """,
-                (datetime.now(), score, attempt_id)
-            )
-            
-            # Get test info for passing score
-            test = await db_pool.fetchone(
-                "SELECT passing_score FROM tests WHERE id = ?",
-                (test_id,)
-            )
+            # Test completed; the attempt stores points, the user sees percent
+            totals = await db.pool.fetchone(_SQL_ATTEMPT_TOTALS, (attempt_id,))
+            await db.pool.execute(_SQL_COMPLETE_ATTEMPT, (totals['score'], attempt_id))
+            percentage = totals['score'] / totals['max_score'] * 100 if totals['max_score'] else 0
             
             # Format completion message
-            completion_text = "📝 Тест завершен!\n\n"
-            completion_text += f"📊 Ваш результат: {score:.1f}%\n"
+            completion_parts = [
+                "📝 Тест завершен!\n\n",
+                f"📊 Ваш результат: {percentage:.1f}%\n"
+            ]
             
-            if test['passing_score']:
-                if score >= test['passing_score']:
-                    completion_text += "✅ Поздравляем! Вы успешно прошли тест!\n"
+            if totals['passing_score']:
+                if percentage >= totals['passing_score']:
+                    completion_parts.append("✅ Поздравляем! Вы успешно прошли тест!\n")
                 else:
-                    completion_text += "❌ К сожалению, вы не набрали проходной балл.\n"
+                    completion_parts.append("❌ К сожалению, вы не набрали проходной балл.\n")
             
             await message.answer(
-                completion_text,
-                reply_markup=get_back_keyboard()
+                "".join(completion_parts),
+                reply_markup=_BACK_KB
             )
             
             # Clear test state
@@ -423,14 +498,28 @@ async def process_answer(message: Message, state: FSMContext):
         logger.error(f"Error processing answer: {e}")
         await message.answer(
             "😔 Произошла ошибка при обработке ответа. Попробуйте позже.",
-            reply_markup=get_back_keyboard()
+            reply_markup=_BACK_KB
         )
         await state.clear()
 
 @router.callback_query(F.data == "back_to_tests")
 async def back_to_tests(callback: CallbackQuery, state: FSMContext):
     """Return to tests list."""
+    # Stop the button spinner before any DB work
+    await callback.answer()
     await state.clear()
+    try:
+        # Edit the current message in place with the (usually memoized) first page
+        _, tests_text, total_pages = await _get_tests_page(1)
+        if tests_text is not None:
+            await callback.message.edit_text(
+                tests_text,
+                reply_markup=_pagination_kb(1, total_pages, "tests")
+            )
+            await state.set_state(TestStates.browsing_tests)
+            return
+    except Exception as e:
+        logger.error(f"Error returning to tests: {e}")
     await show_tests(callback.message, state)
 
 def setup_test_handlers(dp: Dispatcher) -> None:
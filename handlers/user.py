@@ -1,8 +1,10 @@
 """User management handlers for the bot."""
 
+import asyncio
 import logging
+import time
+from enum import IntEnum
 from typing import Optional, Dict, Any
-from datetime import datetime, timedelta
 
 from aiogram import Router, F, Dispatcher
 from aiogram.types import Message, CallbackQuery
@@ -12,6 +14,7 @@ from aiogram.fsm.state import State, StatesGroup
 
 from sqlite_db import db, UserRole
 from utils.db_pool import DatabasePool
+from utils.batcher import AsyncBatcher
 from utils.keyboards import (
     get_main_menu_keyboard,
     get_admin_menu_keyboard,
@@ -27,6 +30,7 @@ config = get_config()
 # Access settings
 ADMIN_IDS = config.ADMIN_IDS
 SESSION_TIMEOUT_MINUTES = config.SESSION_TIMEOUT_MINUTES
+SESSION_TIMEOUT = SESSION_TIMEOUT_MINUTES * 60  # in seconds
 ENABLE_USER_ACTIVITY_TRACKING = config.ENABLE_USER_ACTIVITY_TRACKING
 
 # Configure logging
@@ -35,6 +39,147 @@ logger = logging.getLogger(__name__)
 # Create router
 router = Router()
 
+# Static keyboards are built once at import time
+_MAIN_KB = get_main_menu_keyboard()
+_ADMIN_KB = get_admin_menu_keyboard()
+_CONFIRM_KB = get_confirm_keyboard()
+
+# Static welcome and help texts
+_WELCOME_ADMIN = (
+    "👋 Добро пожаловать в панель администратора!\n\n"
+    "Доступные команды:\n"
+    "/catalog - Управление каталогом\n"
+    "/tests - Управление тестами\n"
+    "/stats - Просмотр статистики\n"
+    "/broadcast - Рассылка сообщений\n"
+    "/help - Справка по командам"
+)
+_WELCOME_USER = (
+    "👋 Добро пожаловать в бот знаний!\n\n"
+    "Доступные команды:\n"
+    "/catalog - Просмотр каталога\n"
+    "/tests - Пройти тесты\n"
+    "/help - Справка по командам"
+)
+_HELP_USER = (
+    "📚 <b>Справка по использованию бота</b>\n\n"
+    "Основные команды:\n"
+    "/start - Начать работу с ботом\n"
+    "/catalog - Просмотр каталога продукции\n"
+    "/search - Поиск по базе знаний\n"
+    "/tests - Доступные тесты\n"
+    "/delete_account - Удалить аккаунт\n"
+    "/help - Показать эту справку\n\n"
+    "Для поиска информации используйте команду /search\n"
+    "Для прохождения тестов используйте команду /tests\n"
+    "Для просмотра каталога используйте команду /catalog"
+)
+_HELP_ADMIN = (
+    _HELP_USER +
+    "\n\n<b>Команды администратора:</b>\n"
+    "/admin - Панель управления\n"
+    "/stats - Статистика использования\n"
+)
+
+# Write statements kept as constants so each pooled connection reuses
+# the same prepared statement from its cache
+_SQL_DELETE_SESSION = "DELETE FROM user_sessions WHERE user_id = ?"
+_SQL_DELETE_USER = "DELETE FROM users WHERE telegram_id = ?"
+
+# Minimum interval between last_active writes for the same user, in seconds
+LAST_ACTIVE_DEBOUNCE = 30
+_last_active_cache: Dict[int, float] = {}  # {telegram_id: monotonic time of last write}
+
+class ActivityBatcher(AsyncBatcher):
+    """Writes buffered last_active updates in one transaction per batch."""
+    
+    async def process_batch(self, items: list) -> None:
+        # Keep only the newest entry per user
+        latest = {item[0]: item for item in items}
+        if not await db.touch_users(list(latest.values())):
+            logger.error("Failed to save activity for %s users", len(latest))
+
+activity_batcher = ActivityBatcher(max_batch_size=500, max_queue_time=5.0)
+
+# Profile rows read by /start and /profile, kept briefly to skip repeat lookups
+USER_CACHE_TTL = 60
+USER_CACHE_SIZE = 10_000
+_user_cache: Dict[int, tuple] = {}  # {telegram_id: (expires_at, user)}
+_user_pending: Dict[int, asyncio.Future] = {}
+
+def _cache_user(user_id: int, user: Dict) -> None:
+    """Store a user row in the cache, evicting the oldest entry when full."""
+    if user_id not in _user_cache and len(_user_cache) >= USER_CACHE_SIZE:
+        del _user_cache[next(iter(_user_cache))]
+    _user_cache[user_id] = (time.monotonic() + USER_CACHE_TTL, user)
+
+async def _get_user_cached(user_id: int) -> Optional[Dict]:
+    """Get a user profile row from the cache or load it once from the database."""
+    entry = _user_cache.get(user_id)
+    if entry and entry[0] > time.monotonic():
+        return entry[1]
+    future = _user_pending.get(user_id)
+    if future is not None:
+        # The same user is already being loaded by a concurrent update
+        return await asyncio.shield(future)
+    future = asyncio.get_running_loop().create_future()
+    _user_pending[user_id] = future
+    user = None
+    try:
+        user = await db.get_user_profile(user_id)
+        if user:
+            _cache_user(user_id, user)
+    finally:
+        del _user_pending[user_id]
+        future.set_result(user)
+    return user
+
+_register_pending: Dict[int, asyncio.Future] = {}
+
+async def _register_user(message: Message) -> Optional[Dict]:
+    """Create the user with one upsert; concurrent /start presses share it."""
+    user_id = message.from_user.id
+    future = _register_pending.get(user_id)
+    if future is not None:
+        return await asyncio.shield(future)
+    future = asyncio.get_running_loop().create_future()
+    _register_pending[user_id] = future
+    user = None
+    try:
+        logger.debug("Upserting user %s", user_id)
+        user = await db.upsert_user({
+            "telegram_id": user_id,
+            "username": message.from_user.username or message.from_user.first_name,
+            "first_name": message.from_user.first_name,
+            "last_name": message.from_user.last_name,
+            "role": UserRole.ADMIN.value if user_id in ADMIN_IDS else UserRole.USER.value,
+            "last_active": int(time.time())
+        })
+        if user:
+            _cache_user(user_id, user)
+            _last_active_cache[user_id] = time.monotonic()
+    finally:
+        del _register_pending[user_id]
+        future.set_result(user)
+    return user
+
+def should_update_last_active(user_id: int) -> bool:
+    """Check whether the user's last_active is due for a write and mark it written."""
+    now = time.monotonic()
+    if now - _last_active_cache.get(user_id, float("-inf")) < LAST_ACTIVE_DEBOUNCE:
+        return False
+    if len(_last_active_cache) > 10_000:
+        # Forget users whose debounce window has already passed
+        for uid, ts in list(_last_active_cache.items()):
+            if now - ts >= LAST_ACTIVE_DEBOUNCE:
+                del _last_active_cache[uid]
+    _last_active_cache[user_id] = now
+    return True
+
+class ConfirmAction(IntEnum):
+    """Actions awaiting confirmation, stored in FSM data as a small int."""
+    DELETE_ACCOUNT = 1
+
 class UserStates(StatesGroup):
     """User state machine states."""
     waiting_for_name = State()
@@ -44,130 +189,66 @@ class UserStates(StatesGroup):
 @router.message(Command("start"))
 async def start_handler(message: Message) -> None:
     """Handle /start command - register new users and send welcome message."""
-    logger.info(f"Start handler called for user {message.from_user.id}")
+    user_id = message.from_user.id
+    logger.debug("Start handler called for user %s", user_id)
     try:
-        # Get user from database
-        logger.info(f"Attempting to get user {message.from_user.id} from database")
-        try:
-            user = await db.get_user(message.from_user.id)
-            logger.info(f"Database query result for user {message.from_user.id}: {user}")
-        except Exception as db_error:
-            logger.error(f"Database error while getting user {message.from_user.id}: {db_error}", exc_info=True)
-            raise
-
-        # Register new user if not exists
-        if not user:
-            logger.info(f"User {message.from_user.id} not found, registering new user")
-            try:
-                user_data = {
-                    "telegram_id": message.from_user.id,
-                    "username": message.from_user.username or message.from_user.first_name,
-                    "first_name": message.from_user.first_name,
-                    "last_name": message.from_user.last_name,
-                    "role": UserRole.ADMIN.value if message.from_user.id in ADMIN_IDS else UserRole.USER.value
-                }
-                await db.register_user(user_data)
-                logger.info(f"Successfully registered new user {message.from_user.id}")
-                user = await db.get_user(message.from_user.id)
-                logger.info(f"Retrieved newly registered user data: {user}")
-            except Exception as reg_error:
-                logger.error(f"Error registering new user {message.from_user.id}: {reg_error}", exc_info=True)
-                raise
-
-        # Update user activity
-        if ENABLE_USER_ACTIVITY_TRACKING:
-            logger.info(f"Updating last active timestamp for user {message.from_user.id}")
-            try:
-                await db.register_user({
-                    "telegram_id": message.from_user.id,
-                    "last_active": datetime.now().isoformat()
-                })
-                logger.info(f"Updated last active timestamp for user {message.from_user.id}")
-            except Exception as activity_error:
-                logger.error(f"Error updating user activity for {message.from_user.id}: {activity_error}", exc_info=True)
-                # Continue even if activity update fails
+        # Existing users come from the cache; new users are created in one
+        # round-trip. last_active is buffered and written in batches.
+        user = await _get_user_cached(user_id)
+        upserted = False
+        if user:
+            if ENABLE_USER_ACTIVITY_TRACKING and should_update_last_active(user_id):
+                await activity_batcher.submit((
+                    user_id,
+                    int(time.time()),
+                    message.from_user.username or message.from_user.first_name
+                ))
+        else:
+            user = await _register_user(message)
+            upserted = True
+            if not user:
+                raise RuntimeError(f"Failed to upsert user {message.from_user.id}")
 
         # Get user role
         user_role = user.get('role', 'user')
-        logger.info(f"User {message.from_user.id} has role: {user_role}")
 
         # Send welcome message
-        logger.info(f"Preparing welcome message for user {message.from_user.id}")
         try:
             if user_role == UserRole.ADMIN.value:
-                welcome_text = (
-                    "👋 Добро пожаловать в панель администратора!\n\n"
-                    "Доступные команды:\n"
-                    "/catalog - Управление каталогом\n"
-                    "/tests - Управление тестами\n"
-                    "/stats - Просмотр статистики\n"
-                    "/broadcast - Рассылка сообщений\n"
-                    "/help - Справка по командам"
-                )
-                keyboard = get_admin_menu_keyboard()
+                await message.answer(_WELCOME_ADMIN, reply_markup=_ADMIN_KB)
             else:
-                welcome_text = (
-                    "👋 Добро пожаловать в бот знаний!\n\n"
-                    "Доступные команды:\n"
-                    "/catalog - Просмотр каталога\n"
-                    "/tests - Пройти тесты\n"
-                    "/help - Справка по командам"
-                )
-                keyboard = get_main_menu_keyboard()
-
-            logger.info(f"Sending welcome message to user {message.from_user.id}")
-            await message.answer(welcome_text, reply_markup=keyboard)
-            logger.info(f"Welcome message sent successfully to user {message.from_user.id}")
+                await message.answer(_WELCOME_USER, reply_markup=_MAIN_KB)
 
             # Track metrics
-            logger.info(f"Tracking metrics for user {message.from_user.id}")
             metrics_collector.increment_message_count()
-            logger.info(f"Metrics incremented for user {message.from_user.id}")
 
         except Exception as msg_error:
-            logger.error(f"Error sending welcome message to user {message.from_user.id}: {msg_error}", exc_info=True)
+            logger.error("Error sending welcome message to user %s: %s", message.from_user.id, msg_error, exc_info=True)
             raise
 
+        logger.info("start_handler done user=%s role=%s upserted=%s", user_id, user_role, upserted)
+
     except Exception as e:
-        logger.error(f"Critical error in start_handler for user {message.from_user.id}: {e}", exc_info=True)
+        logger.error("Critical error in start_handler for user %s: %s", message.from_user.id, e, exc_info=True)
         try:
             await message.answer("Произошла ошибка при обработке команды. Пожалуйста, попробуйте позже.")
         except Exception as final_error:
-            logger.error(f"Failed to send error message to user {message.from_user.id}: {final_error}", exc_info=True)
+            logger.error("Failed to send error message to user %s: %s", message.from_user.id, final_error, exc_info=True)
         raise
 
 @router.message(Command("help"))
 async def help_handler(message: Message) -> None:
     """Handle /help command."""
-    user_id = message.from_user.id
-    is_admin = user_id in ADMIN_IDS
-    
-    help_text = (
-        "📚 <b>Справка по использованию бота</b>\n\n"
-        "Основные команды:\n"
-        "/start - Начать работу с ботом\n"
-        "/catalog - Просмотр каталога продукции\n"
-        "/search - Поиск по базе знаний\n"
-        "/tests - Доступные тесты\n"
-        "/help - Показать эту справку\n\n"
-        "Для поиска информации используйте команду /search\n"
-        "Для прохождения тестов используйте команду /tests\n"
-        "Для просмотра каталога используйте команду /catalog"
+    await message.answer(
+        _HELP_ADMIN if message.from_user.id in ADMIN_IDS else _HELP_USER
     )
-    
-    if is_admin:
-        help_text += "\n\n<b>Команды администратора:</b>\n"
-        help_text += "/admin - Панель управления\n"
-        help_text += "/stats - Статистика использования\n"
-    
-    await message.answer(help_text)
     metrics_collector.increment_message_count()
 
 @router.message(Command("profile"))
 async def profile_handler(message: Message) -> None:
     """Handle /profile command."""
     user_id = message.from_user.id
-    user = await db.get_user(user_id)
+    user = await _get_user_cached(user_id)
     
     if not user:
         await message.answer(
@@ -177,14 +258,14 @@ async def profile_handler(message: Message) -> None:
     
     # Calculate session time remaining
     session_time = None
-    if user.get("last_active"):
-        last_active = datetime.fromisoformat(user["last_active"])
-        session_end = last_active + timedelta(minutes=SESSION_TIMEOUT_MINUTES)
-        if datetime.now() < session_end:
-            session_time = (session_end - datetime.now()).total_seconds() / 60
+    last_active = user.get("last_active_ts")
+    if last_active:
+        remaining = last_active + SESSION_TIMEOUT - int(time.time())
+        if remaining > 0:
+            session_time = remaining // 60
     
-    # Format profile information
-    profile_text = (
+    # Format profile information; optional sections are appended only when present
+    profile_parts = [
         "👤 <b>Ваш профиль</b>\n\n"
         f"ID: {user['telegram_id']}\n"
         f"Имя: {user['first_name'] or 'Не указано'}\n"
@@ -192,16 +273,16 @@ async def profile_handler(message: Message) -> None:
         f"Username: @{user['username'] or 'Не указан'}\n"
         f"Роль: {user['role']}\n"
         f"Дата регистрации: {user['created_at']}\n"
-    )
+    ]
     
     if session_time:
-        profile_text += f"\n⏳ Время до окончания сессии: {session_time:.0f} мин."
+        profile_parts.append(f"\n⏳ Время до окончания сессии: {session_time} мин.")
     
     # Add admin-specific information
     if user_id in ADMIN_IDS:
-        profile_text += "\n\n🔐 Статус: Администратор"
+        profile_parts.append("\n\n🔐 Статус: Администратор")
     
-    await message.answer(profile_text)
+    await message.answer("".join(profile_parts))
     metrics_collector.increment_message_count()
 
 @router.message(Command("logout"))
@@ -210,34 +291,37 @@ async def logout_handler(message: Message, state: FSMContext) -> None:
     user_id = message.from_user.id
     
     # Clear user session
-    await db.execute(
-        "DELETE FROM user_sessions WHERE user_id = ?",
-        (user_id,)
-    )
+    await db.execute(_SQL_DELETE_SESSION, (user_id,))
     
     await message.answer(
         "👋 Вы успешно вышли из системы.\n"
         "Используйте /start для повторного входа.",
-        reply_markup=get_main_menu_keyboard()
+        reply_markup=_MAIN_KB
     )
     await state.clear()
     metrics_collector.increment_message_count()
 
-@router.callback_query(F.data == "back_to_main")
+@router.message(Command("delete_account"))
+async def delete_account_handler(message: Message, state: FSMContext) -> None:
+    """Handle /delete_account command - ask to confirm account deletion."""
+    await state.set_state(UserStates.waiting_for_confirmation)
+    await state.update_data(action=ConfirmAction.DELETE_ACCOUNT.value)
+    await message.answer(
+        "⚠️ Удалить ваш аккаунт? Это действие нельзя отменить.",
+        reply_markup=_CONFIRM_KB
+    )
+    metrics_collector.increment_message_count()
+
 async def back_to_main_handler(callback: CallbackQuery, state: FSMContext) -> None:
     """Handle 'Back to main menu' callback."""
-    user_id = callback.from_user.id
-    is_admin = user_id in ADMIN_IDS
-    
     await callback.message.edit_text(
         "Главное меню",
-        reply_markup=get_admin_menu_keyboard() if is_admin else get_main_menu_keyboard()
+        reply_markup=_ADMIN_KB if callback.from_user.id in ADMIN_IDS else _MAIN_KB
     )
     await state.clear()
     await callback.answer()
     metrics_collector.increment_message_count()
 
-@router.callback_query(F.data == "confirm_action")
 async def confirm_action_handler(callback: CallbackQuery, state: FSMContext) -> None:
     """Handle action confirmation."""
     state_data = await state.get_data()
@@ -248,12 +332,10 @@ async def confirm_action_handler(callback: CallbackQuery, state: FSMContext) ->
         return
     
     try:
-        if action == "delete_account":
+        if action == ConfirmAction.DELETE_ACCOUNT:
             # Delete user account
-            await db.execute(
-                "DELETE FROM users WHERE telegram_id = ?",
-                (callback.from_user.id,)
-            )
+            await db.execute(_SQL_DELETE_USER, (callback.from_user.id,))
+            _user_cache.pop(callback.from_user.id, None)
             await callback.message.edit_text(
                 "❌ Ваш аккаунт удален.\n"
                 "Используйте /start для регистрации нового аккаунта."
@@ -266,21 +348,44 @@ async def confirm_action_handler(callback: CallbackQuery, state: FSMContext) ->
         metrics_collector.increment_message_count()
     
     except Exception as e:
-        logger.error(f"Error in confirm_action_handler: {e}")
+        logger.error("Error in confirm_action_handler: %s", e)
         await callback.answer("Произошла ошибка при выполнении действия")
         metrics_collector.increment_error_count()
 
-@router.callback_query(F.data == "cancel_action")
 async def cancel_action_handler(callback: CallbackQuery, state: FSMContext) -> None:
     """Handle action cancellation."""
     await callback.message.edit_text(
         "Действие отменено",
-        reply_markup=get_main_menu_keyboard()
+        reply_markup=_MAIN_KB
     )
     await state.clear()
     await callback.answer()
     metrics_collector.increment_message_count()
 
+# Main menu reply buttons mapped to the command handlers they stand for
+_MENU_ACTIONS = {
+    "❓ Помощь": lambda message, state: help_handler(message),
+    "👤 Профиль": lambda message, state: profile_handler(message),
+    "🚪 Выход": logout_handler,
+}
+
+@router.message(F.text.in_(_MENU_ACTIONS.keys()))
+async def menu_button_handler(message: Message, state: FSMContext) -> None:
+    """Handle main menu reply buttons with a single table lookup."""
+    await _MENU_ACTIONS[message.text](message, state)
+
+# Callback data of the user menu buttons mapped to their handlers
+_CALLBACK_ACTIONS = {
+    "back_to_main": back_to_main_handler,
+    "confirm_action": confirm_action_handler,
+    "cancel_action": cancel_action_handler,
+}
+
+@router.callback_query(F.data.in_(_CALLBACK_ACTIONS.keys()))
+async def callback_action_handler(callback: CallbackQuery, state: FSMContext) -> None:
+    """Handle user menu callbacks with a single table lookup."""
+    await _CALLBACK_ACTIONS[callback.data](callback, state)
+
 def setup_user_handlers(dp: Router) -> None:
     """Register user handlers with the dispatcher."""
     dp.include_router(router)
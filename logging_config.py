@@ -1,6 +1,8 @@
+import atexit
 import logging
 import logging.handlers
 import os
+import queue
 from datetime import datetime
 from typing import Optional
 from logging.handlers import RotatingFileHandler
@@ -12,6 +14,9 @@ LOG_DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
 MAX_BYTES = 10 * 1024 * 1024  # 10MB
 BACKUP_COUNT = 5
 
+# Background listener that writes queued records to the real handlers
+_queue_listener: Optional[logging.handlers.QueueListener] = None
+
 def setup_logging() -> None:
     """Setup logging configuration for the application"""
     # Create logs directory if it doesn't exist
@@ -47,9 +52,21 @@ def setup_logging() -> None:
     console_handler.setLevel(logging.INFO)
     console_handler.setFormatter(console_formatter)
     
-    # Add handlers to root logger
-    root_logger.addHandler(file_handler)
-    root_logger.addHandler(console_handler)
+    # Route records through a queue so file and console I/O happen in a
+    # background thread instead of the event loop. The stock QueueHandler
+    # renders the message and traceback before enqueueing, so records never
+    # hold references to caller objects that may change or be freed
+    global _queue_listener
+    stop_logging()
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    _queue_listener = logging.handlers.QueueListener(
+        log_queue,
+        file_handler,
+        console_handler,
+        respect_handler_level=True
+    )
+    _queue_listener.start()
+    root_logger.addHandler(logging.handlers.QueueHandler(log_queue))
     
     # Set logging level for specific modules
     logging.getLogger('aiogram').setLevel(logging.WARNING)
@@ -58,6 +75,15 @@ def setup_logging() -> None:
     # Log initial message
     logging.info("Logging system initialized")
 
+def stop_logging() -> None:
+    """Flush queued log records and stop the background listener"""
+    global _queue_listener
+    if _queue_listener is not None:
+        _queue_listener.stop()
+        _queue_listener = None
+
+atexit.register(stop_logging)
+
 def get_logger(name: str) -> logging.Logger:
     """Get a logger instance with the specified name"""
     return logging.getLogger(name)
@@ -65,35 +91,25 @@ def get_logger(name: str) -> logging.Logger:
 def cleanup_old_logs() -> None:
     """Clean up old log files keeping only the last N backups"""
     try:
-        # Get list of log files
-        log_files = []
-        for filename in os.listdir(LOG_DIR):
-            if filename.startswith("bot_") and filename.endswith(".log"):
-                filepath = os.path.join(LOG_DIR, filename)
-                try:
-                    # Get file creation time
-                    timestamp = datetime.strptime(
-                        filename[4:-4],  # Remove 'bot_' prefix and '.log' suffix
-                        "%Y%m%d"
-                    )
-                    log_files.append({
-                        'filename': filename,
-                        'path': filepath,
-                        'created_at': timestamp
-                    })
-                except ValueError:
-                    continue
-        
-        # Sort by creation time
-        log_files.sort(key=lambda x: x['created_at'], reverse=True)
+        # Names are bot_YYYYMMDD.log, so name order is chronological order
+        with os.scandir(LOG_DIR) as entries:
+            log_files = sorted(
+                (
+                    entry for entry in entries
+                    if entry.name.startswith("bot_") and entry.name.endswith(".log")
+                    and entry.name[4:-4].isdigit()
+                ),
+                key=lambda entry: entry.name,
+                reverse=True
+            )
         
         # Remove old files
-        for log_file in log_files[BACKUP_COUNT:]:
+        for entry in log_files[BACKUP_COUNT:]:
             try:
-                os.remove(log_file['path'])
-                logging.info(f"Removed old log file: {log_file['filename']}")
+                os.remove(entry.path)
+                logging.info(f"Removed old log file: {entry.name}")
             except Exception as e:
-                logging.error(f"Failed to remove log file {log_file['filename']}: {e}")
+                logging.error(f"Failed to remove log file {entry.name}: {e}")
     
     except Exception as e:
         logging.error(f"Failed to cleanup old logs: {e}")
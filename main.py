@@ -14,6 +14,7 @@ from datetime import datetime
 from aiogram import Bot, Dispatcher, types
 from aiogram.enums import ParseMode
 from aiogram.client.default import DefaultBotProperties
+from aiogram.client.session.aiohttp import AiohttpSession
 from aiogram.filters import Command
 from aiogram.types import BotCommand, BotCommandScopeDefault, BotCommandScopeChat, Update
 from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
@@ -25,7 +26,7 @@ load_dotenv() # Load environment variables from .env file
 import config
 from utils.db_pool import DatabasePool
 from utils.resource_manager import ResourceManager
-from logging_config import setup_logging
+from logging_config import setup_logging, stop_logging
 from middleware import (
     MetricsMiddleware,
     ErrorHandlingMiddleware,
@@ -46,7 +47,8 @@ import sqlite_db
 app_config = config.get_config()
 
 # Import handler setup functions
-from handlers.user import setup_user_handlers
+from handlers.user import setup_user_handlers, activity_batcher
+from handlers.testing import attempt_batcher
 from handlers.catalog import setup_catalog_handlers
 from handlers.tests import setup_test_handlers
 from handlers.admin import setup_admin_handlers
@@ -59,17 +61,44 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-logger.info(f"Environment: {app_config.ENVIRONMENT}, IS_PRODUCTION: {app_config.is_production()}")
+logger.info("Environment: %s, IS_PRODUCTION: %s", app_config.ENVIRONMENT, app_config.is_production())
+
+# Bot API responses and webhook bodies are decoded with the session's
+# json_loads, so use orjson there when it is installed
+try:
+    import orjson
+    bot_session = AiohttpSession(
+        json_loads=orjson.loads,
+        json_dumps=lambda obj: orjson.dumps(obj).decode()
+    )
+except ImportError:
+    bot_session = None
 
 # Initialize bot
 bot = Bot(
     token=app_config.BOT_TOKEN,
+    session=bot_session,
     default=DefaultBotProperties(parse_mode=ParseMode.HTML)
 )
 
 # Initialize Dispatcher with storage
 dp = Dispatcher(storage=MemoryStorage())
 
+# Middleware and routers are registered once at import, before any
+# startup event, so a repeated on_startup can never attach them twice
+dp.update.middleware(MetricsMiddleware())
+dp.update.middleware(ErrorHandlingMiddleware())
+dp.update.middleware(StateManagementMiddleware())
+dp.update.middleware(LoggingMiddleware())
+dp.update.middleware(AdminAccessMiddleware())
+dp.update.middleware(UserActivityMiddleware())
+dp.update.middleware(RateLimitMiddleware())
+
+setup_user_handlers(dp)
+setup_catalog_handlers(dp)
+setup_test_handlers(dp)
+setup_admin_handlers(dp)
+
 # Define storage keys
 STORAGE_KEYS = {
     'db_pool': 'db_pool',
@@ -91,7 +120,7 @@ async def on_startup(bot: Bot, dispatcher: Dispatcher) -> None:
             )
             await new_db_pool.initialize()
             logger.info("Database pool initialized successfully")
-            logger.info(f"Database file path: {app_config.DB_FILE}")
+            logger.info("Database file path: %s", app_config.DB_FILE)
 
             # Store db_pool in storage
             logger.info("Storing database pool in dispatcher storage...")
@@ -117,7 +146,7 @@ async def on_startup(bot: Bot, dispatcher: Dispatcher) -> None:
             logger.info("Database connection verified successfully")
 
         except Exception as db_error:
-            logger.error(f"Database initialization failed: {db_error}", exc_info=True)
+            logger.error("Database initialization failed: %s", db_error, exc_info=True)
             raise RuntimeError(f"Database initialization failed: {db_error}")
 
         # Initialize metrics collector
@@ -130,58 +159,21 @@ async def on_startup(bot: Bot, dispatcher: Dispatcher) -> None:
             )
             logger.info("Metrics collector initialized and stored")
         except Exception as metrics_error:
-            logger.error(f"Metrics collector initialization failed: {metrics_error}", exc_info=True)
+            logger.error("Metrics collector initialization failed: %s", metrics_error, exc_info=True)
             raise RuntimeError(f"Metrics collector initialization failed: {metrics_error}")
 
-        # Register middleware
-        logger.info("Registering middleware...")
-        try:
-            dispatcher.update.middleware(MetricsMiddleware())
-            dispatcher.update.middleware(ErrorHandlingMiddleware())
-            dispatcher.update.middleware(StateManagementMiddleware())
-            dispatcher.update.middleware(LoggingMiddleware())
-            dispatcher.update.middleware(AdminAccessMiddleware())
-            dispatcher.update.middleware(UserActivityMiddleware())
-            dispatcher.update.middleware(RateLimitMiddleware())
-            logger.info("All middleware registered successfully")
-        except Exception as middleware_error:
-            logger.error(f"Middleware registration failed: {middleware_error}", exc_info=True)
-            raise RuntimeError(f"Middleware registration failed: {middleware_error}")
-
         # Setup bot commands
         logger.info("Setting up bot commands...")
         try:
             await setup_bot_commands(bot)
             logger.info("Bot commands configured successfully")
         except Exception as commands_error:
-            logger.error(f"Bot commands setup failed: {commands_error}", exc_info=True)
+            logger.error("Bot commands setup failed: %s", commands_error, exc_info=True)
             raise RuntimeError(f"Bot commands setup failed: {commands_error}")
 
-        # Setup handlers
-        logger.info("Setting up handlers...")
-        try:
-            logger.info("Setting up user handlers...")
-            setup_user_handlers(dispatcher)
-            logger.info("User handlers registered")
-            
-            logger.info("Setting up catalog handlers...")
-            setup_catalog_handlers(dispatcher)
-            logger.info("Catalog handlers registered")
-            
-            logger.info("Setting up test handlers...")
-            setup_test_handlers(dispatcher)
-            logger.info("Test handlers registered")
-            
-            logger.info("Setting up admin handlers...")
-            setup_admin_handlers(dispatcher)
-            logger.info("Admin handlers registered")
-        except Exception as handlers_error:
-            logger.error(f"Handlers setup failed: {handlers_error}", exc_info=True)
-            raise RuntimeError(f"Handlers setup failed: {handlers_error}")
-
         logger.info("Application startup completed successfully")
     except Exception as e:
-        logger.error(f"Critical error during startup: {e}", exc_info=True)
+        logger.error("Critical error during startup: %s", e, exc_info=True)
         raise RuntimeError(f"Application startup failed: {e}")
 
 async def on_shutdown(bot: Bot, dispatcher: Dispatcher) -> None:
@@ -195,13 +187,21 @@ async def on_shutdown(bot: Bot, dispatcher: Dispatcher) -> None:
         metrics_data = await dispatcher.storage.get_data(key=STORAGE_KEYS['metrics_collector'])
         metrics = metrics_data.get('metrics_collector') if metrics_data else None
 
+        # Write out batched activity and test attempts while the pool is open;
+        # the dispatcher's own shutdown hooks run before its routers' hooks
+        try:
+            await activity_batcher.flush()
+            await attempt_batcher.shutdown()
+        except Exception as e:
+            logger.error("Error flushing batched writes: %s", e)
+
         # Cleanup database pool
         if db_pool:
             try:
                 await db_pool.close()
                 logger.info("Database pool closed")
             except Exception as e:
-                logger.error(f"Error closing database pool: {e}")
+                logger.error("Error closing database pool: %s", e)
 
         # Cleanup metrics
         if metrics:
@@ -209,7 +209,7 @@ async def on_shutdown(bot: Bot, dispatcher: Dispatcher) -> None:
                 await metrics.cleanup()
                 logger.info("Metrics collector cleaned up")
             except Exception as e:
-                logger.error(f"Error cleaning up metrics: {e}")
+                logger.error("Error cleaning up metrics: %s", e)
 
         # Close bot session
         if bot and bot.session and not bot.session.closed:
@@ -217,20 +217,20 @@ async def on_shutdown(bot: Bot, dispatcher: Dispatcher) -> None:
                 await bot.session.close()
                 logger.info("Bot session closed")
             except Exception as e:
-                logger.error(f"Error closing bot session during shutdown: {e}")
+                logger.error("Error closing bot session during shutdown: %s", e)
 
         logger.info("Application shutdown completed")
     except Exception as e:
-        logger.error(f"Error during shutdown: {e}")
+        logger.error("Error during shutdown: %s", e)
         raise
 
 def handle_exception(loop: asyncio.AbstractEventLoop, context: Dict[str, Any]) -> None:
     """Handle uncaught exceptions in the event loop."""
     exception = context.get('exception', context['message'])
-    logger.error(f"Uncaught exception: {exception}", exc_info=exception if isinstance(exception, Exception) else None)
+    logger.error("Uncaught exception: %s", exception, exc_info=exception if isinstance(exception, Exception) else None)
 
     # The dispatcher's shutdown handlers will be called by aiogram's integration with aiohttp
-    # for webhook mode, and explicitly in polling mode's finally block.
+    # for webhook mode, and by start_polling itself in polling mode.
     # No need to manually schedule on_shutdown here.
 
 def get_ssl_context() -> Optional[ssl.SSLContext]:
@@ -242,7 +242,7 @@ def get_ssl_context() -> Optional[ssl.SSLContext]:
         ssl_context.load_cert_chain(app_config.WEBHOOK_SSL_CERT, app_config.WEBHOOK_SSL_PRIV)
         return ssl_context
     except Exception as e:
-        logger.error(f"Failed to create SSL context: {e}", exc_info=True)
+        logger.error("Failed to create SSL context: %s", e, exc_info=True)
         return None
 
 async def setup_bot_commands(bot: Bot) -> None:
@@ -279,7 +279,7 @@ async def setup_bot_commands(bot: Bot) -> None:
 
         logger.info("Bot commands configured successfully")
     except Exception as e:
-        logger.error(f"Error setting up bot commands: {e}", exc_info=True)
+        logger.error("Error setting up bot commands: %s", e, exc_info=True)
         raise
 
 # Register our custom startup and shutdown handlers with the dispatcher
@@ -290,14 +290,14 @@ dp.shutdown.register(on_shutdown)
 app = web.Application()
 
 logger.info("Starting aiohttp web application...\n")
-logger.info(f"Binding to port: {app_config.PORT}\n")
+logger.info("Binding to port: %s\n", app_config.PORT)
 
 async def setup_webhook_and_run_app(bot: Bot, dp: Dispatcher):
     """Sets up the webhook and runs the aiohttp application."""
     # Use globally defined bot and dp instances
 
     logger.info("Starting aiohttp web server...")
-    logger.info(f"Binding to host: {app_config.HOST}, port: {app_config.PORT}")
+    logger.info("Binding to host: %s, port: %s", app_config.HOST, app_config.PORT)
 
     if not app_config.WEBHOOK_HOST:
         logger.error("WEBHOOK_HOST or RENDER_EXTERNAL_URL environment variable is not set.")
@@ -313,7 +313,7 @@ async def setup_webhook_and_run_app(bot: Bot, dp: Dispatcher):
     # Use a fixed webhook path without the bot token
     webhook_path = "/webhook"
     webhook_url = f"https://{webhook_host}{webhook_path}"
-    logger.info(f"Full webhook URL: {webhook_url}")
+    logger.info("Full webhook URL: %s", webhook_url)
 
     try:
         # Create an instance of SimpleRequestHandler and register it with the aiohttp application
@@ -346,32 +346,45 @@ async def setup_webhook_and_run_app(bot: Bot, dp: Dispatcher):
                 else:
                     logger.warning("Metrics collector not found in storage, health check handler not added")
             except Exception as metrics_error:
-                logger.warning(f"Could not setup health check handler: {metrics_error}")
+                logger.warning("Could not setup health check handler: %s", metrics_error)
 
         # Set webhook for the bot
-        logger.info(f"Setting webhook to: {webhook_url}")
+        logger.info("Setting webhook to: %s", webhook_url)
         await bot.set_webhook(
             url=webhook_url,
             allowed_updates=app_config.ALLOWED_UPDATES,
             secret_token=app_config.WEBHOOK_SECRET,
+            max_connections=app_config.WEBHOOK_MAX_CONNECTIONS,
+            drop_pending_updates=app_config.DROP_PENDING_UPDATES,
         )
         logger.info("Webhook set successfully")
         webhook_info = await bot.get_webhook_info()
-        logger.info(f"Webhook info: {webhook_info}")
+        logger.info("Webhook info: %s", webhook_info)
 
         # Start the aiohttp web server
-        runner = web.AppRunner(app)
+        # Skip the per-request access log line on the webhook hot path
+        runner = web.AppRunner(app, access_log=None)
         await runner.setup()
         site = web.TCPSite(runner, app_config.HOST, app_config.PORT)
         await site.start()
         logger.info("aiohttp web server started")
 
-        # Keep the application running until interrupted
-        # This line is crucial for keeping the aiohttp server alive
-        await asyncio.Event().wait()
+        # Keep the application running until SIGTERM/SIGINT on the running loop
+        stop_event = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            try:
+                loop.add_signal_handler(sig, stop_event.set)
+            except NotImplementedError:
+                pass
+        await stop_event.wait()
+
+        # Cleaning up the runner fires the dispatcher shutdown hooks
+        logger.info("Received shutdown signal, stopping aiohttp web server...")
+        await runner.cleanup()
 
     except Exception as e:
-        logger.critical(f"Critical error during application startup: {e}", exc_info=True)
+        logger.critical("Critical error during application startup: %s", e, exc_info=True)
         await on_shutdown(bot, dp) # Ensure cleanup on critical error
         raise # Re-raise the exception to terminate the process
 
@@ -380,6 +393,13 @@ if __name__ == "__main__":
         # Setup logging
         setup_logging()
 
+        # Prefer the libuv-based loop when it is installed
+        try:
+            import uvloop
+            asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+        except ImportError:
+            pass
+
         # Create new event loop
         loop = asyncio.new_event_loop()
         asyncio.set_event_loop(loop)
@@ -392,50 +412,48 @@ if __name__ == "__main__":
             try:
                 loop.run_until_complete(setup_webhook_and_run_app(bot, dp)) # Pass global bot and dp
             except Exception as e:
-                logger.error(f"Error in webhook mode: {e}", exc_info=True)
+                logger.error("Error in webhook mode: %s", e, exc_info=True)
                 # Try to cleanup on error
                 try:
                     loop.run_until_complete(on_shutdown(bot, dp))
                 except Exception as shutdown_error:
-                    logger.error(f"Error during shutdown: {shutdown_error}")
+                    logger.error("Error during shutdown: %s", shutdown_error)
                 raise
         elif app_config.ENABLE_POLLING:
             # In polling mode, we need to run the dispatcher directly
             logger.info("Starting bot in polling mode...")
             try:
-                # Run startup handlers first
-                loop.run_until_complete(on_startup(bot, dp))
-                
-                # Then start polling
-                loop.create_task(dp.start_polling(
+                # start_polling has no drop_pending_updates parameter; pending
+                # updates are dropped together with any previously set webhook
+                loop.run_until_complete(bot.delete_webhook(
+                    drop_pending_updates=app_config.DROP_PENDING_UPDATES
+                ))
+                # start_polling awaits the registered startup handlers before
+                # the first getUpdates and the shutdown handlers after it stops
+                loop.run_until_complete(dp.start_polling(
                     bot,
                     allowed_updates=app_config.ALLOWED_UPDATES,
-                    drop_pending_updates=True
+                    polling_timeout=app_config.POLLING_TIMEOUT
                 ))
-                # Run the event loop
-                logger.info("Bot in polling mode started. Running event loop forever.")
-                loop.run_forever()
             except KeyboardInterrupt:
                 logger.info("Received shutdown signal, stopping bot...")
             except Exception as e:
-                logger.error(f"Error in polling mode: {e}", exc_info=True)
+                logger.error("Error in polling mode: %s", e, exc_info=True)
             finally:
                 logger.info("Polling mode cleanup completed.")
-                # Run shutdown handlers
-                try:
-                    loop.run_until_complete(on_shutdown(bot, dp))
-                except Exception as shutdown_error:
-                    logger.error(f"Error during shutdown: {shutdown_error}")
                 # Close the event loop
                 try:
                     if not loop.is_closed():
                         loop.close()
                         logger.info("Event loop closed in polling cleanup.")
                 except Exception as loop_error:
-                    logger.error(f"Error closing event loop: {loop_error}", exc_info=True)
+                    logger.error("Error closing event loop: %s", loop_error, exc_info=True)
         else:
             raise RuntimeError("Neither webhook nor polling mode is enabled")
 
     except Exception as e:
-        logger.error(f"Application error: {e}", exc_info=True)
+        logger.error("Application error: %s", e, exc_info=True)
         sys.exit(1)
+    finally:
+        # Write out log records still queued for the background listener
+        stop_logging()
@@ -14,6 +14,11 @@ from logging_config import app_logger, user_logger, admin_logger
 from sqlite_db import db
 from config import get_config
 from monitoring.metrics import metrics_collector
+from handlers.user import (
+    ENABLE_USER_ACTIVITY_TRACKING,
+    activity_batcher,
+    should_update_last_active
+)
 from utils.error_handling import handle_errors, log_operation, validate_state
 
 logger = logging.getLogger(__name__)
@@ -96,7 +101,7 @@ class ErrorHandlingMiddleware(BaseMiddleware):
         try:
             return await handler(event, data)
         except Exception as e:
-            logger.error(f"Error in handler {get_handler_name(handler)}: {e}", exc_info=True)
+            logger.error("Error in handler %s: %s", get_handler_name(handler), e, exc_info=True)
             metrics_collector.increment_error_count(str(type(e).__name__))
             
             # Try to send error message to user
@@ -112,7 +117,7 @@ class ErrorHandlingMiddleware(BaseMiddleware):
                         show_alert=True
                     )
             except Exception as send_error:
-                logger.error(f"Error sending error message: {send_error}")
+                logger.error("Error sending error message: %s", send_error)
             
             raise
 
@@ -166,13 +171,13 @@ class LoggingMiddleware(BaseMiddleware):
             # Log event
             if isinstance(event, Message):
                 logger.info(
-                    f"Processing message from user {event.from_user.id}: "
-                    f"{event.text or '[non-text message]'}"
+                    "Processing message from user %s: %s",
+                    event.from_user.id, event.text or '[non-text message]'
                 )
             elif isinstance(event, CallbackQuery):
                 logger.info(
-                    f"Processing callback from user {event.from_user.id}: "
-                    f"{event.data}"
+                    "Processing callback from user %s: %s",
+                    event.from_user.id, event.data
                 )
             
             # Process event
@@ -214,7 +219,7 @@ class TimingMiddleware(BaseMiddleware):
             end_time = time.time()
             duration = end_time - start_time
             handler_name = get_handler_name(handler)
-            logger.debug(f"Handler '{handler_name}' executed in {duration:.4f} seconds")
+            logger.debug("Handler '%s' executed in %.4f seconds", handler_name, duration)
             metrics_collector.record_operation(operation=f"handler_execution_{handler_name}", duration=duration)
 
 class AdminAccessMiddleware(BaseMiddleware):
@@ -235,7 +240,7 @@ class AdminAccessMiddleware(BaseMiddleware):
         if get_flag(handler, "admin_only"):
             user_id = event.from_user.id
             if user_id not in self.config.ADMIN_IDS: # Use self.config.ADMIN_IDS
-                logger.warning(f"User {user_id} attempted to access admin-only handler {get_handler_name(handler)}")
+                logger.warning("User %s attempted to access admin-only handler %s", user_id, get_handler_name(handler))
                 if isinstance(event, Message):
                     await event.answer("У вас нет прав для выполнения этой команды.")
                 elif isinstance(event, CallbackQuery):
@@ -256,36 +261,20 @@ class UserActivityMiddleware(BaseMiddleware):
         event: TelegramObject,
         data: Dict[str, Any]
     ) -> Any:
-        """Process event and log user activity."""
-        # We need the user service from the context, which is set in main.py::on_startup
-        user_service = data.get("user_service")
-        if not user_service:
-            logger.error("UserService not found in middleware data.")
-            return await handler(event, data) # Continue without logging activity
-
-        user = event.from_user
-        action = None
-        details = None
-
-        if isinstance(event, Message):
-            action = "message"
-            details = f"Text: {event.text}"
-        elif isinstance(event, CallbackQuery):
-            action = "callback_query"
-            details = f"Data: {event.data}"
-        elif isinstance(event, Update):
-            # This might be too broad, consider specific update types if needed
-            action = "update"
-            details = f"Update ID: {event.update_id}"
-        
-        if user and action:
-            # Log activity in a non-blocking way if possible, or update last activity
-            # For now, let's update last activity directly for simplicity
-            try:
-                await user_service.update_last_activity(user.id) # Assuming user.id is Telegram ID
-                # If you need detailed logging, you'd call a specific log_activity method here
-            except Exception as e:
-                logger.error(f"Error updating user last activity for {user.id}: {e}")
+        """Process event and queue the user's last_active write."""
+        # Writes are debounced per user and flushed by the shared activity
+        # batcher, so a burst of updates costs one executemany, not N UPDATEs
+        user = data.get("event_from_user")
+        if (
+            user
+            and ENABLE_USER_ACTIVITY_TRACKING
+            and should_update_last_active(user.id)
+        ):
+            await activity_batcher.submit((
+                user.id,
+                int(time.time()),
+                user.username or user.first_name
+            ))
 
         return await handler(event, data)
 
@@ -321,7 +310,7 @@ class RateLimitMiddleware(BaseMiddleware):
         timestamps[:] = [t for t in timestamps if current_time - t < window]
 
         if len(timestamps) >= rate_limit:
-            logger.warning(f"User {user_id} hit rate limit for {type(event).__name__}")
+            logger.warning("User %s hit rate limit for %s", user_id, type(event).__name__)
             if isinstance(event, Message):
                 await event.answer(
                     "Слишком много запросов. Пожалуйста, подождите немного и попробуйте снова."
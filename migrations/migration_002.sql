@@ -0,0 +1,37 @@
+-- Create full-text index over products for ranked search.
+-- detail='column' stores no token positions, keeping postings compact;
+-- search only issues per-term prefix queries, which do not need them.
+CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5(
+    name,
+    description,
+    content='products',
+    content_rowid='id',
+    detail='column'
+);
+
+-- Create triggers keeping the full-text index in sync with products
+CREATE TRIGGER IF NOT EXISTS products_fts_insert
+AFTER INSERT ON products
+BEGIN
+    INSERT INTO products_fts (rowid, name, description)
+    VALUES (NEW.id, NEW.name, NEW.description);
+END;
+
+CREATE TRIGGER IF NOT EXISTS products_fts_delete
+AFTER DELETE ON products
+BEGIN
+    INSERT INTO products_fts (products_fts, rowid, name, description)
+    VALUES ('delete', OLD.id, OLD.name, OLD.description);
+END;
+
+CREATE TRIGGER IF NOT EXISTS products_fts_update
+AFTER UPDATE OF name, description ON products
+BEGIN
+    INSERT INTO products_fts (products_fts, rowid, name, description)
+    VALUES ('delete', OLD.id, OLD.name, OLD.description);
+    INSERT INTO products_fts (rowid, name, description)
+    VALUES (NEW.id, NEW.name, NEW.description);
+END;
+
+-- Index products created before the full-text table existed
+INSERT INTO products_fts (products_fts) VALUES ('rebuild');
@@ -0,0 +1,13 @@
+-- Create table for in-progress test sessions shared between bot workers
+CREATE TABLE IF NOT EXISTS test_sessions (
+    user_id INTEGER PRIMARY KEY,  -- Telegram user ID
+    test_id TEXT NOT NULL,
+    test_total INTEGER NOT NULL DEFAULT 0,
+    current_question INTEGER NOT NULL DEFAULT 0,
+    score INTEGER NOT NULL DEFAULT 0,
+    answers BLOB NOT NULL DEFAULT x'',  -- selected options, packed int16
+    correct BLOB NOT NULL DEFAULT x'',  -- one byte per answer, 1 if correct
+    expires_at REAL NOT NULL  -- unix timestamp
+);
+
+CREATE INDEX IF NOT EXISTS idx_test_sessions_expires ON test_sessions(expires_at);
@@ -0,0 +1,6 @@
+-- Create composite index for per-user attempt lookups on a test.
+-- Serves both the attempts count and the latest-attempt query with an
+-- index seek; test_questions(test_id) already orders by rowid (id), so
+-- question lookups need no new index.
+CREATE INDEX IF NOT EXISTS idx_test_attempts_user_test_started
+ON test_attempts(user_id, test_id, started_at DESC);
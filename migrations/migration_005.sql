@@ -0,0 +1,6 @@
+-- Create covering index for per-user attempt statistics.
+-- Holds every column the per-user aggregates and the attempts-with-title
+-- join read, so those queries are answered from the index alone
+-- without touching test_attempts rows.
+CREATE INDEX IF NOT EXISTS idx_test_attempts_user_covering
+ON test_attempts(user_id, is_completed, score, max_score, test_id, completed_at);
@@ -0,0 +1,4 @@
+-- Store answer options for choice questions as a JSON list.
+-- For 'single' questions correct_answer holds the JSON index of the
+-- correct option, for 'multiple' a JSON list of indexes.
+ALTER TABLE test_questions ADD COLUMN options TEXT;
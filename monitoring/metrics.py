@@ -75,7 +75,11 @@ class MetricsCollector:
                 logger.info("Metrics collection stopped")
     
     def increment_message_count(self):
-        """Increment message counter."""
+        """Increment message counter.
+        
+        Handlers all run on the event loop thread, so a plain increment is
+        safe and needs no lock or batching.
+        """
         self._message_count += 1
     
     def increment_callback_count(self):
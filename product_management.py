@@ -18,6 +18,7 @@ from aiogram.utils.keyboard import InlineKeyboardBuilder
 
 from sqlite_db import db, DatabaseError
 from user_management import user_manager, UserRole
+from utils.cache_versions import bump_products_version, bump_tests_version
 
 # Configure logging
 logging.basicConfig(
@@ -207,6 +208,8 @@ class ProductManagement:
             params = list(update_data.values()) + [category_id]
 
             await self._db.execute(query, tuple(params))
+            bump_products_version(category_id)
+            bump_tests_version()
             logger.info(f"Successfully updated category {category_id}")
             return True
 
@@ -239,6 +242,8 @@ class ProductManagement:
 
                 # Delete category and its products (cascade)
                 await conn.execute("DELETE FROM categories WHERE id = ?", (category_id,))
+                bump_products_version(category_id)
+                bump_tests_version()
                 return True
 
         except Exception as e:
@@ -267,6 +272,7 @@ class ProductManagement:
                             is_active, created_at, updated_at
                         ) VALUES (?, ?, ?, ?, 1, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)
                     """, (category_id, name, description, image_path))
+                    bump_products_version(category_id)
                     return cursor.lastrowid
 
         except CategoryNotFoundError:
@@ -380,6 +386,10 @@ class ProductManagement:
             params = list(update_data.values()) + [product_id]
 
             await self._db.execute(query, tuple(params))
+            bump_products_version(product.category_id)
+            if "category_id" in update_data:
+                bump_products_version(update_data["category_id"])
+            bump_tests_version()
             logger.info(f"Successfully updated product {product_id}")
             return True
 
@@ -407,6 +417,8 @@ class ProductManagement:
 
                 # Delete product
                 await conn.execute("DELETE FROM products WHERE id = ?", (product_id,))
+                bump_products_version(product.category_id)
+                bump_tests_version()
                 return True
 
         except ProductNotFoundError:
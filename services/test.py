@@ -11,6 +11,7 @@ from database.repositories import (
     TestResultRepository,
     UserRepository
 )
+from utils.cache_versions import bump_tests_version
 from .base import BaseService
 
 class TestService(BaseService[Test]):
@@ -65,6 +66,7 @@ class TestService(BaseService[Test]):
             if questions:
                 self._add_questions(session, test.id, questions)
             
+            bump_tests_version()
             return test
     
     def _add_questions(
@@ -186,6 +188,8 @@ class TestService(BaseService[Test]):
                 # Add new questions
                 self._add_questions(session, test_id, questions)
             
+            if updates or questions is not None:
+                bump_tests_version()
             return test
     
     def get_test_with_questions(self, test_id: int) -> Optional[Dict[str, Any]]:
@@ -15,6 +15,7 @@ import shutil
 from config import get_config
 from utils.db_pool import with_connection
 from utils.resource_manager import log_execution_time
+from utils.cache_versions import bump_tests_version
 
 # Configure logging
 logging.basicConfig(
@@ -45,6 +46,43 @@ class UserRole(str, Enum):
     ADMIN = "admin"
     MODERATOR = "moderator"
 
+# Names of the migration files already applied to this database
+_SQL_CREATE_SCHEMA_MIGRATIONS = """
+    CREATE TABLE IF NOT EXISTS schema_migrations (
+        name TEXT PRIMARY KEY,
+        applied_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+    );
+"""
+
+# Reads by Telegram ID; served by idx_test_attempts_user_test_started
+_SQL_GET_TEST_ATTEMPTS = """
+    SELECT a.score, a.max_score, a.started_at
+    FROM test_attempts a
+    JOIN users u ON u.id = a.user_id
+    WHERE u.telegram_id = ? AND a.test_id = ? AND a.is_completed = 1
+    ORDER BY a.started_at DESC, a.id DESC
+    LIMIT ?
+"""
+# Inserts nothing (instead of failing) for an unknown user or test
+_SQL_INSERT_TEST_ATTEMPT = """
+    INSERT INTO test_attempts (
+        user_id, test_id, score, max_score,
+        is_completed, completed_at
+    )
+    SELECT u.id, t.id, ?, ?, 1, CURRENT_TIMESTAMP
+    FROM users u, tests t
+    WHERE u.telegram_id = ? AND t.id = ?
+"""
+
+def _build_fts_query(text: str) -> str:
+    """Turn free user input into an FTS5 prefix query (all terms must match).
+
+    Terms are quoted individually rather than as one phrase because the
+    products_fts index is built with detail='column' and has no positions.
+    """
+    terms = text.replace('"', ' ').split()
+    return " ".join(f'"{term}"*' for term in terms)
+
 @dataclass
 class DatabaseStats:
     """Database statistics"""
@@ -80,7 +118,8 @@ class DatabasePool:
                     conn = await aiosqlite.connect(
                         self.config.DB_FILE,
                         timeout=self.config.DB_POOL_TIMEOUT,
-                        isolation_level=None  # Enable autocommit mode
+                        isolation_level=None,  # Enable autocommit mode
+                        cached_statements=512  # Keep hot queries prepared
                     )
                     conn.row_factory = aiosqlite.Row
                     await conn.execute("PRAGMA foreign_keys = ON")
@@ -141,6 +180,11 @@ class Database:
         """Set the database pool instance."""
         self._pool = pool
 
+    @property
+    def pool(self) -> Optional[DatabasePool]:
+        """The connection pool set by initialize()"""
+        return self._pool
+
     @with_connection
     async def execute(self, conn: aiosqlite.Connection, query: str, params: tuple = ()) -> None:
         """Execute a query without returning results"""
@@ -279,7 +323,7 @@ class Database:
         await self.cleanup_old_backups()
 
     async def _run_migrations(self):
-        """Run database migrations from files."""
+        """Apply pending migration files, each exactly once."""
         migrations_dir = Path(self.config.DB_MIGRATIONS_DIR)
         if not migrations_dir.exists():
             logger.info(f"Migrations directory does not exist: {migrations_dir}. Skipping migrations.")
@@ -292,16 +336,32 @@ class Database:
             logger.info("No migration files found. Skipping migrations.")
             return
 
-        for migration_file in migration_files:
-            try:
-                logger.info(f"Applying migration: {migration_file.name}")
-                with open(migration_file, 'r') as f:
-                    script = f.read()
-                await self.execute(script)
-                logger.info(f"Migration {migration_file.name} applied successfully.")
-            except Exception as e:
-                logger.error(f"Failed to apply migration {migration_file.name}: {e}", exc_info=True)
-                raise DatabaseMigrationError(f"Failed to apply migration {migration_file.name}: {e}")
+        async with self._pool.acquire() as conn:
+            await conn.executescript(_SQL_CREATE_SCHEMA_MIGRATIONS)
+            async with conn.execute("SELECT name FROM schema_migrations") as cursor:
+                applied = {row[0] for row in await cursor.fetchall()}
+
+            for migration_file in migration_files:
+                if migration_file.name in applied:
+                    continue
+                try:
+                    logger.info(f"Applying migration: {migration_file.name}")
+                    script = migration_file.read_text(encoding="utf-8")
+                    # Files hold several statements, so they go through
+                    # executescript; wrapping the file and its bookkeeping
+                    # row in one transaction applies both or neither
+                    name = migration_file.name.replace("'", "''")
+                    await conn.executescript(
+                        f"BEGIN;\n{script}\n;\n"
+                        f"INSERT INTO schema_migrations (name) VALUES ('{name}');\n"
+                        "COMMIT;"
+                    )
+                    logger.info(f"Migration {migration_file.name} applied successfully.")
+                except Exception as e:
+                    if conn.in_transaction:
+                        await conn.rollback()
+                    logger.error(f"Failed to apply migration {migration_file.name}: {e}", exc_info=True)
+                    raise DatabaseMigrationError(f"Failed to apply migration {migration_file.name}: {e}")
         logger.info("All migrations applied successfully.")
 
     @asynccontextmanager
@@ -326,7 +386,11 @@ class Database:
                     else:
                         await cursor.execute(query)
                     rows = await cursor.fetchall()
-                    return [dict(row) for row in rows]
+                # Writes open an implicit transaction on the pooled connection;
+                # left open it would break the next transaction() on it
+                if conn.in_transaction:
+                    await conn.commit()
+                return [dict(row) for row in rows]
             except Exception as e:
                 raise DatabaseQueryError(f"Query failed: {e}")
 
@@ -340,7 +404,9 @@ class Database:
                     else:
                         await cursor.execute(query)
                     row = await cursor.fetchone()
-                    return dict(row) if row else None
+                if conn.in_transaction:
+                    await conn.commit()
+                return dict(row) if row else None
             except Exception as e:
                 raise DatabaseQueryError(f"Query failed: {e}")
 
@@ -350,6 +416,7 @@ class Database:
             try:
                 async with conn.cursor() as cursor:
                     await cursor.executemany(query, params_list)
+                await conn.commit()
             except Exception as e:
                 raise DatabaseQueryError(f"Batch query failed: {e}")
 
@@ -395,6 +462,66 @@ class Database:
             logger.error(f"Failed to get user: {e}")
             return None
 
+    async def get_user_profile(self, telegram_id: int) -> Optional[Dict]:
+        """Get user by telegram ID with last_active as UNIX seconds"""
+        try:
+            return await self.execute_one(
+                """
+                SELECT *, CAST(strftime('%s', last_active) AS INTEGER) AS last_active_ts
+                FROM users WHERE telegram_id = ?
+                """,
+                (telegram_id,)
+            )
+        except Exception as e:
+            logger.error(f"Failed to get user profile: {e}")
+            return None
+
+    async def upsert_user(self, user_data: Dict) -> Optional[Dict]:
+        """Create the user or refresh username/last_active, returning the profile row
+
+        ``last_active`` is given as UNIX seconds and stored in the same text
+        format as CURRENT_TIMESTAMP.
+        """
+        try:
+            rows = await self.execute("""
+                INSERT INTO users (
+                    telegram_id, username, first_name, last_name,
+                    role, last_active, created_at, is_active
+                ) VALUES (?, ?, ?, ?, ?, datetime(?, 'unixepoch'), CURRENT_TIMESTAMP, 1)
+                ON CONFLICT(telegram_id) DO UPDATE SET
+                    last_active = excluded.last_active,
+                    username = excluded.username
+                RETURNING *, CAST(strftime('%s', last_active) AS INTEGER) AS last_active_ts
+            """, (
+                user_data["telegram_id"],
+                user_data.get("username"),
+                user_data.get("first_name"),
+                user_data.get("last_name"),
+                user_data.get("role", UserRole.USER.value),
+                user_data.get("last_active")
+            ))
+            return rows[0] if rows else None
+        except Exception as e:
+            logger.error(f"Failed to upsert user: {e}")
+            return None
+
+    async def touch_users(self, activity: List[Tuple[int, int, Optional[str]]]) -> bool:
+        """Update last_active (UNIX seconds) and username for many users in a single transaction"""
+        try:
+            async with self.transaction() as conn:
+                await conn.executemany(
+                    "UPDATE users SET last_active = datetime(?, 'unixepoch'), username = ? "
+                    "WHERE telegram_id = ?",
+                    [
+                        (last_active, username, telegram_id)
+                        for telegram_id, last_active, username in activity
+                    ]
+                )
+            return True
+        except Exception as e:
+            logger.error(f"Failed to update user activity: {e}")
+            return False
+
     async def verify_password(self, telegram_id: int, password: str) -> bool:
         """Verify user password"""
         try:
@@ -431,6 +558,52 @@ class Database:
             logger.error(f"Failed to add product: {e}")
             return None
 
+    async def get_product(self, product_id: int) -> Optional[Dict]:
+        """Get active product by ID"""
+        try:
+            return await self.execute_one(
+                "SELECT * FROM products WHERE id = ? AND is_active = 1",
+                (product_id,)
+            )
+        except Exception as e:
+            logger.error(f"Failed to get product: {e}")
+            return None
+
+    # Category management methods
+    async def get_categories(self, include_inactive: bool = False) -> List[Dict]:
+        """Get categories ordered for display"""
+        try:
+            query = "SELECT * FROM categories"
+            if not include_inactive:
+                query += " WHERE is_active = 1"
+            query += " ORDER BY order_num, name"
+            return await self.execute(query)
+        except Exception as e:
+            logger.error(f"Failed to get categories: {e}")
+            return []
+
+    async def get_category(self, category_id: int) -> Optional[Dict]:
+        """Get category by ID"""
+        try:
+            return await self.execute_one(
+                "SELECT * FROM categories WHERE id = ?",
+                (category_id,)
+            )
+        except Exception as e:
+            logger.error(f"Failed to get category: {e}")
+            return None
+
+    async def get_category_with_products(
+        self,
+        category_id: int
+    ) -> Tuple[Optional[Dict], List[Dict]]:
+        """Get a category and its active products with concurrent reads"""
+        category, products = await asyncio.gather(
+            self.get_category(category_id),
+            self.get_products_by_category(category_id)
+        )
+        return category, products
+
     async def get_products_by_category(
         self,
         category_id: int,
@@ -454,6 +627,29 @@ class Database:
             logger.error(f"Failed to get products: {e}")
             return []
 
+    async def search_products(self, query: str, limit: int = 10) -> List[Dict]:
+        """Search active products by name and description.
+
+        Ranking and the ``limit`` cutoff happen inside the FTS5 query, so
+        SQLite only materializes the top matches. Only ``id`` and ``name``
+        are returned, which is all the search results view renders.
+        """
+        match = _build_fts_query(query)
+        if not match:
+            return []
+        try:
+            return await self.execute("""
+                SELECT p.id, p.name
+                FROM products_fts
+                JOIN products p ON p.id = products_fts.rowid
+                WHERE products_fts MATCH ? AND p.is_active = 1
+                ORDER BY products_fts.rank
+                LIMIT ?
+            """, (match, limit))
+        except Exception as e:
+            logger.error(f"Failed to search products: {e}")
+            return []
+
     # Test management methods
     async def add_test(self, test_data: Dict) -> Optional[int]:
         """Add a new test"""
@@ -482,21 +678,33 @@ class Database:
                             await cursor.execute("""
                                 INSERT INTO test_questions (
                                     test_id, question_text, question_type,
-                                    correct_answer, points
-                                ) VALUES (?, ?, ?, ?, ?)
+                                    options, correct_answer, points
+                                ) VALUES (?, ?, ?, ?, ?, ?)
                             """, (
                                 test_id,
                                 question["text"],
                                 question.get("type", "single"),
+                                json.dumps(question["options"]) if "options" in question else None,
                                 json.dumps(question["correct_answer"]),
                                 question.get("points", 1)
                             ))
 
+                    bump_tests_version()
                     return test_id
         except Exception as e:
             logger.error(f"Failed to add test: {e}")
             return None
 
+    async def get_tests_list(self) -> List[Dict]:
+        """Get active tests for the selection menu"""
+        try:
+            return await self.execute(
+                "SELECT id, title FROM tests WHERE is_active = 1 ORDER BY title"
+            )
+        except Exception as e:
+            logger.error(f"Failed to get tests list: {e}")
+            return []
+
     async def get_test(self, test_id: int) -> Optional[Dict]:
         """Get test with questions"""
         try:
@@ -524,6 +732,90 @@ class Database:
             logger.error(f"Failed to get test: {e}")
             return None
 
+    async def save_test_attempts(self, attempts: List[Dict]) -> List[Dict]:
+        """Save completed test attempts in a single transaction.
+
+        Rows are inserted one at a time so that an unknown user, a deleted
+        test or any other bad row cannot roll back the rest of the batch.
+        Returns the attempts that were not saved.
+        """
+        rejected = []
+        try:
+            async with self.transaction() as conn:
+                for attempt in attempts:
+                    try:
+                        async with conn.execute(_SQL_INSERT_TEST_ATTEMPT, (
+                            attempt["score"],
+                            attempt["max_score"],
+                            int(attempt["user_id"]),
+                            int(attempt["test_id"])
+                        )) as cursor:
+                            # No row means the user or the test does not exist
+                            if cursor.rowcount != 1:
+                                rejected.append(attempt)
+                    except Exception as e:
+                        logger.warning(f"Failed to save test attempt {attempt!r}: {e}")
+                        rejected.append(attempt)
+            return rejected
+        except Exception as e:
+            logger.error(f"Failed to save test attempts: {e}")
+            return list(attempts)
+
+    async def get_test_attempts(self, user_id: int, test_id: int, limit: int = 3) -> List[Dict]:
+        """Get a user's latest completed attempts at a test, newest first"""
+        try:
+            return await self.execute(
+                _SQL_GET_TEST_ATTEMPTS,
+                (int(user_id), int(test_id), limit)
+            )
+        except Exception as e:
+            logger.error(f"Failed to get test attempts: {e}")
+            return []
+
+    async def save_test_session(self, session: Dict, expires_at: float) -> bool:
+        """Create or replace a user's in-progress test session"""
+        try:
+            await self.execute("""
+                INSERT OR REPLACE INTO test_sessions (
+                    user_id, test_id, test_total, current_question,
+                    score, answers, correct, expires_at
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """, (
+                int(session["user_id_str"]),
+                session["test_id"],
+                session["test_total"],
+                session["current_question"],
+                session["score"],
+                session["answers"].tobytes(),
+                bytes(session["correct"]),
+                expires_at
+            ))
+            return True
+        except Exception as e:
+            logger.error(f"Failed to save test session: {e}")
+            return False
+
+    async def get_test_session(self, user_id: int, now: float) -> Optional[Dict]:
+        """Get a user's test session if it has not expired"""
+        try:
+            return await self.execute_one(
+                "SELECT * FROM test_sessions WHERE user_id = ? AND expires_at > ?",
+                (user_id, now)
+            )
+        except Exception as e:
+            logger.error(f"Failed to get test session: {e}")
+            return None
+
+    async def delete_test_session(self, user_id: int, now: float) -> None:
+        """Delete a user's test session and any expired sessions"""
+        try:
+            await self.execute(
+                "DELETE FROM test_sessions WHERE user_id = ? OR expires_at <= ?",
+                (user_id, now)
+            )
+        except Exception as e:
+            logger.error(f"Failed to delete test session: {e}")
+
     # Statistics methods
     async def get_database_stats(self) -> DatabaseStats:
         """Get database statistics"""
@@ -151,7 +151,7 @@ class SystemTester:
                 raise Exception("Category creation failed")
             
             # Test category retrieval
-            categories = db.get_categories()
+            categories = await db.get_categories()
             if not any(c['id'] == category_id for c in categories):
                 raise Exception("Category retrieval failed")
             
@@ -377,7 +377,7 @@ class SystemTester:
                 raise Exception("Invalid category ID handling failed")
             
             # Test invalid product ID
-            product = db.get_product(-1)
+            product = await db.get_product(-1)
             if product is not None:
                 raise Exception("Invalid product ID handling failed")
             
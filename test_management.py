@@ -30,6 +30,7 @@ from admin_panel import (
     truncate_message
 )
 from user_management import user_manager, UserRole, UserState
+from utils.cache_versions import bump_tests_version
 
 # Configure logging
 logging.basicConfig(
@@ -149,6 +150,7 @@ class TestManagement:
                             is_active, created_at, updated_at
                         ) VALUES (?, ?, ?, ?, ?, 1, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)
                     """, (title, description, category_id, time_limit, min_pass_score))
+                    bump_tests_version()
                     return cursor.lastrowid
         except Exception as e:
             logger.error(f"Error creating test: {e}")
@@ -295,6 +297,7 @@ class TestManagement:
                             points, order_num
                         ) VALUES (?, ?, ?, ?, ?, ?)
                     """, (test_id, text, type.value, json.dumps(options), points, order_num))
+                    bump_tests_version()
                     return cursor.lastrowid
 
         except TestNotFoundError:
@@ -589,25 +592,26 @@ async def my_tests_command(message: Message) -> None:
             await message.answer("У вас пока нет завершенных тестов.")
             return
 
-        # Group attempts by test
+        # Summarize attempts per test in a single pass:
+        # {test_id: [first attempt, attempts count, best score]}
         test_attempts = {}
         for attempt in attempts:
-            if attempt.test_id not in test_attempts:
-                test_attempts[attempt.test_id] = []
-            test_attempts[attempt.test_id].append(attempt)
+            summary = test_attempts.get(attempt.test_id)
+            if summary is None:
+                test_attempts[attempt.test_id] = [attempt, 1, attempt.score]
+            else:
+                summary[1] += 1
+                if attempt.score > summary[2]:
+                    summary[2] = attempt.score
 
         # Format message
         message_text = "<b>Ваши тесты:</b>\n\n"
-        for test_id, attempts in test_attempts.items():
-            test = attempts[0]  # Get test info from first attempt
-            best_score = max(a.score for a in attempts)
-            attempts_count = len(attempts)
-            
+        for test, attempts_count, best_score in test_attempts.values():
             message_text += (
                 f"<b>{test.test_title}</b>\n"
                 f"• Попыток: {attempts_count}\n"
                 f"• Лучший результат: {best_score:.1f}%\n"
-                f"• Последняя попытка: {attempts[0].end_time.strftime('%d.%m.%Y %H:%M')}\n\n"
+                f"• Последняя попытка: {test.end_time.strftime('%d.%m.%Y %H:%M')}\n\n"
             )
 
         # Create keyboard with test buttons
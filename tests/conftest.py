@@ -0,0 +1,22 @@
+"""Shared fixtures for the test suite."""
+
+import os
+
+os.environ.setdefault("BOT_TOKEN", "123456:test-token")
+os.environ.setdefault("ADMIN_IDS", "1")
+
+import pytest
+
+from sqlite_db import Database
+from utils.db_pool import DatabasePool
+
+@pytest.fixture
+async def db():
+    """Freshly migrated in-memory database."""
+    pool = DatabasePool(db_file=":memory:", pool_size=1)
+    await pool.initialize()
+    database = Database()
+    database.set_pool(pool)
+    await database._run_migrations()
+    yield database
+    await pool.close()
@@ -0,0 +1,78 @@
+"""Tests for product full-text search."""
+
+import pytest
+
+from sqlite_db import _build_fts_query
+
+PRODUCTS = [
+    ("Морковь мытая", "Свежая морковь", 1),
+    ("Морковь по-корейски", "Салат", 1),
+    ("Свекла", "Корнеплод для борща", 1),
+    ("Морковный сок", "Снят с продажи", 0),
+]
+
+@pytest.fixture
+async def products_db(db):
+    """Database with one category and a few products."""
+    await db.execute("INSERT INTO categories (name) VALUES (?)", ("Овощи",))
+    for name, description, is_active in PRODUCTS:
+        await db.execute(
+            "INSERT INTO products (category_id, name, description, is_active) "
+            "VALUES (1, ?, ?, ?)",
+            (name, description, is_active)
+        )
+    return db
+
+def test_build_fts_query_prefix_terms():
+    """Each term becomes a quoted prefix query."""
+    assert _build_fts_query("морковь") == '"морковь"*'
+    assert _build_fts_query("  морковь   мытая ") == '"морковь"* "мытая"*'
+
+def test_build_fts_query_strips_quotes():
+    """Double quotes in user input cannot break out of a term."""
+    assert _build_fts_query('мор"ковь') == '"мор"* "ковь"*'
+    assert _build_fts_query('"') == ""
+
+def test_build_fts_query_empty():
+    """Blank input produces no query."""
+    assert _build_fts_query("") == ""
+    assert _build_fts_query("   ") == ""
+
+async def test_search_matches_prefix(products_db):
+    """A prefix finds every active product starting with it."""
+    results = await products_db.search_products("морк")
+    assert {row["name"] for row in results} == {"Морковь мытая", "Морковь по-корейски"}
+    assert set(results[0]) == {"id", "name"}
+
+async def test_search_matches_description(products_db):
+    """Terms are looked up in descriptions too."""
+    results = await products_db.search_products("борщ")
+    assert [row["name"] for row in results] == ["Свекла"]
+
+async def test_search_skips_inactive(products_db):
+    """Inactive products are never returned."""
+    results = await products_db.search_products("сок")
+    assert results == []
+
+async def test_search_respects_limit(products_db):
+    """The limit is applied inside the query."""
+    results = await products_db.search_products("морк", limit=1)
+    assert len(results) == 1
+
+async def test_search_follows_product_updates(products_db):
+    """Triggers keep the index in sync with renamed products."""
+    await products_db.execute("UPDATE products SET name = ? WHERE name = ?", ("Капуста", "Свекла"))
+    assert [row["name"] for row in await products_db.search_products("капус")] == ["Капуста"]
+    assert await products_db.search_products("свекл") == []
+
+async def test_search_blank_query(products_db):
+    """Blank or quote-only input returns no results without querying."""
+    assert await products_db.search_products("   ") == []
+    assert await products_db.search_products('"') == []
+
+async def test_migrations_apply_once(db):
+    """Re-running migrations skips files that were already applied."""
+    applied = await db.execute("SELECT name FROM schema_migrations ORDER BY name")
+    await db._run_migrations()
+    assert await db.execute("SELECT name FROM schema_migrations ORDER BY name") == applied
+    assert "migration_002.sql" in {row["name"] for row in applied}
@@ -0,0 +1,25 @@
+"""Tests for batched test attempt saving."""
+
+def _attempt(user_id, test_id, score=3):
+    return {"user_id": str(user_id), "test_id": test_id, "score": score, "max_score": 5}
+
+async def _seed(db):
+    await db.execute("INSERT INTO users (telegram_id) VALUES (?)", (100,))
+    await db.execute("INSERT INTO tests (title) VALUES (?)", ("Морковь",))
+
+async def test_save_test_attempts_saves_batch(db):
+    """Every valid attempt is stored."""
+    await _seed(db)
+    rejected = await db.save_test_attempts([_attempt(100, 1), _attempt(100, 1, score=5)])
+    assert rejected == []
+    rows = await db.execute("SELECT score FROM test_attempts ORDER BY score")
+    assert [row["score"] for row in rows] == [3, 5]
+
+async def test_save_test_attempts_rejects_bad_rows_only(db):
+    """An unknown user or test does not roll back the rest of the batch."""
+    await _seed(db)
+    bad_user, bad_test = _attempt(999, 1), _attempt(100, 42)
+    rejected = await db.save_test_attempts([bad_user, _attempt(100, 1), bad_test])
+    assert rejected == [bad_user, bad_test]
+    rows = await db.execute("SELECT user_id, test_id FROM test_attempts")
+    assert len(rows) == 1
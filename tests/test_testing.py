@@ -0,0 +1,42 @@
+"""Tests for the test-taking flow."""
+
+import array
+from unittest.mock import AsyncMock, MagicMock
+
+from handlers import testing
+
+TEST = {"title": "Сорта моркови", "passing_score": 50}
+
+async def _start(db):
+    """Seed a user with one earlier attempt and return an answered session."""
+    await db.execute("INSERT INTO users (telegram_id) VALUES (?)", (100,))
+    await db.execute("INSERT INTO tests (title, passing_score) VALUES (?, ?)", ("Сорта моркови", 50))
+    await db.save_test_attempts([{"user_id": "100", "test_id": "1", "score": 0, "max_score": 2}])
+    session = {
+        "test_id": "1",
+        "test": TEST,
+        "test_total": 2,
+        "user_id_str": "100",
+        "current_question": 2,
+        "answers": array.array("h", [0, 1]),
+        "correct": bytearray([1, 1]),
+        "score": 2
+    }
+    await testing.TestSessionManager.save_session(session)
+    return session
+
+async def test_finish_test_session_shows_result(db):
+    """Finishing a test saves the attempt, ends the session and shows the result."""
+    testing._lazy_init()
+    session = await _start(db)
+    query = MagicMock(from_user=MagicMock(id=100), message=MagicMock(edit_text=AsyncMock()))
+
+    await testing.finish_test_session(query, session, TEST)
+    await testing.attempt_batcher.flush()
+
+    text = query.message.edit_text.await_args.kwargs["text"]
+    assert "2/2 (100.0%)" in text
+    assert "Тест пройден" in text
+    assert "1. 0/2 (0.0%) - ❌" in text
+    assert await testing.TestSessionManager.get_session(100) is None
+    assert len(await db.get_test_attempts(100, 1, limit=10)) == 2
@@ -0,0 +1,124 @@
+"""Tests for the /tests handlers."""
+
+import json
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from handlers import tests as tests_handlers
+from utils import cache_versions
+
+@pytest.fixture
+async def tests_db(db):
+    """Migrated database with one registered user and a two-question test."""
+    await db.execute("INSERT INTO users (telegram_id) VALUES (?)", (100,))
+    await db.execute("INSERT INTO categories (name) VALUES (?)", ("Овощи",))
+    await db.execute(
+        "INSERT INTO tests (title, description, category_id, time_limit, passing_score) "
+        "VALUES (?, ?, 1, 10, 80)",
+        ("Сорта моркови", "Основные сорта")
+    )
+    await db.execute_many(
+        "INSERT INTO test_questions (test_id, question_text, question_type, options, correct_answer) "
+        "VALUES (1, ?, ?, ?, ?)",
+        [
+            ("Какой сорт самый сладкий?", "single", json.dumps(["Шантане", "Нантская"]), "1"),
+            ("Какого цвета морковь?", "text", None, json.dumps("Оранжевая"))
+        ]
+    )
+    cache_versions.bump_tests_version()
+    return db
+
+def _callback(data: str, user_id: int = 100) -> MagicMock:
+    return MagicMock(
+        data=data,
+        from_user=MagicMock(id=user_id),
+        answer=AsyncMock(),
+        message=MagicMock(edit_text=AsyncMock())
+    )
+
+def _state() -> MagicMock:
+    return MagicMock(set_state=AsyncMock(), update_data=AsyncMock(), clear=AsyncMock())
+
+async def test_show_tests_lists_active_tests(tests_db):
+    """The /tests handler reads the list through the pool and answers."""
+    message = MagicMock(answer=AsyncMock())
+    state = _state()
+
+    await tests_handlers.show_tests(message, state)
+
+    text = message.answer.await_args.args[0]
+    assert "📚 Овощи" in text
+    assert "• Сорта моркови" in text
+    assert "✅ Проходной балл: 80%" in text
+    state.set_state.assert_awaited_once_with(tests_handlers.TestStates.browsing_tests)
+
+@pytest.mark.parametrize("page", ["-3", "0", "99"])
+async def test_show_tests_page_clamps_page(tests_db, page):
+    """Out-of-range pages show the nearest existing page."""
+    callback = _callback(f"tests_page_{page}")
+
+    await tests_handlers.show_tests_page(callback, _state())
+
+    assert "• Сорта моркови" in callback.message.edit_text.await_args.args[0]
+    assert list(tests_handlers._tests_cache["pages"]) == [1]
+
+async def test_show_test_details(tests_db):
+    """Test details include the category and the last completed attempt."""
+    await tests_db.save_test_attempts(
+        [{"user_id": "100", "test_id": "1", "score": 1, "max_score": 2}]
+    )
+    callback = _callback("test_1")
+
+    await tests_handlers.show_test_details(callback, _state())
+
+    text = callback.message.edit_text.await_args.args[0]
+    assert "📚 Категория: Овощи" in text
+    assert "• Результат: 50.0%" in text
+
+async def test_start_test_creates_attempt(tests_db):
+    """Starting a test records an attempt and shows the first question."""
+    callback = _callback("start_test_1")
+    state = _state()
+
+    await tests_handlers.start_test(callback, state)
+
+    text = callback.message.edit_text.await_args.args[0]
+    assert "📝 Вопрос 1:" in text
+    assert "2. Нантская" in text
+    attempts = await tests_db.execute("SELECT id, max_score FROM test_attempts")
+    assert attempts == [{"id": 1, "max_score": 2}]
+    assert state.update_data.await_args.kwargs["current_attempt"] == 1
+
+async def test_start_test_requires_registration(tests_db):
+    """Unregistered users are asked to /start before taking a test."""
+    callback = _callback("start_test_1", user_id=999)
+
+    await tests_handlers.start_test(callback, _state())
+
+    assert "/start" in callback.message.edit_text.await_args.args[0]
+    assert await tests_db.execute("SELECT id FROM test_attempts") == []
+
+async def test_answering_completes_attempt(tests_db):
+    """Answers are stored per question and the finished attempt is scored."""
+    state = _state()
+    await tests_handlers.start_test(_callback("start_test_1"), state)
+    data = dict(state.update_data.await_args.kwargs)
+    state.get_data = AsyncMock(return_value=data)
+    state.update_data = AsyncMock(side_effect=lambda **kwargs: data.update(kwargs))
+
+    for answer in ("2", "оранжевая"):
+        message = MagicMock(text=answer, answer=AsyncMock())
+        await tests_handlers.process_answer(message, state)
+
+    text = message.answer.await_args.args[0]
+    assert "📊 Ваш результат: 100.0%" in text
+    assert "Вы успешно прошли тест" in text
+    state.clear.assert_awaited_once()
+    assert await tests_db.execute("SELECT score, is_completed FROM test_attempts") == [
+        {"score": 2, "is_completed": 1}
+    ]
+    assert await tests_db.execute("SELECT answer, is_correct FROM user_answers ORDER BY id") == [
+        {"answer": '"2"', "is_correct": 1},
+        {"answer": '"оранжевая"', "is_correct": 1}
+    ]
@@ -0,0 +1,26 @@
+"""Tests for the user account handlers."""
+
+from unittest.mock import AsyncMock, MagicMock
+
+from handlers import user as user_handlers
+
+async def test_delete_account_after_confirmation(db):
+    """/delete_account stores the pending action; confirming deletes the user."""
+    await db.execute("INSERT INTO users (telegram_id) VALUES (?)", (100,))
+    data = {}
+    state = MagicMock(
+        set_state=AsyncMock(),
+        update_data=AsyncMock(side_effect=lambda **kwargs: data.update(kwargs)),
+        get_data=AsyncMock(return_value=data),
+        clear=AsyncMock()
+    )
+
+    await user_handlers.delete_account_handler(MagicMock(answer=AsyncMock()), state)
+    assert data == {"action": user_handlers.ConfirmAction.DELETE_ACCOUNT.value}
+
+    callback = MagicMock(from_user=MagicMock(id=100), message=MagicMock(edit_text=AsyncMock()))
+    await user_handlers.confirm_action_handler(callback, state)
+
+    assert "аккаунт удален" in callback.message.edit_text.await_args.args[0]
+    assert await db.execute("SELECT id FROM users") == []
+    state.clear.assert_awaited_once()
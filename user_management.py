@@ -36,6 +36,9 @@ logger = logging.getLogger(__name__)
 # Create router for user management
 router = Router()
 
+# Session lifetime, built once instead of on every session update
+_SESSION_DELTA = timedelta(minutes=SESSION_TIMEOUT_MINUTES)
+
 # User roles
 class UserRole(str, Enum):
     USER = "user"
@@ -227,12 +230,16 @@ def get_user_stats(user_id: int) -> Dict[str, Any]:
     # Get test attempts
     attempts = db.get_user_test_attempts(user_id)
     total_tests = len(attempts)
-    successful_tests = sum(1 for a in attempts if a['is_successful'])
-    total_score = sum(a['score'] for a in attempts)
+    successful_tests = 0
+    total_score = 0
+    for a in attempts:
+        successful_tests += bool(a['is_successful'])
+        total_score += a['score']
     
     # Calculate activity level
+    week_ago = datetime.now() - timedelta(days=7)
     last_week_activity = sum(1 for a in activity if 
-        datetime.fromisoformat(a['timestamp']) > datetime.now() - timedelta(days=7))
+        datetime.fromisoformat(a['timestamp']) > week_ago)
     activity_level = "Высокая" if last_week_activity > 10 else "Средняя" if last_week_activity > 3 else "Низкая"
     
     return {
@@ -250,12 +257,13 @@ def get_user_stats(user_id: int) -> Dict[str, Any]:
 def update_user_session(user_id: int) -> None:
     """Update user session timestamp"""
     try:
+        now = datetime.now()
         db.update_user(user_id, {
-            "last_activity": datetime.now().isoformat(),
-            "session_expires": (datetime.now() + timedelta(minutes=SESSION_TIMEOUT_MINUTES)).isoformat()
+            "last_activity": now.isoformat(),
+            "session_expires": (now + _SESSION_DELTA).isoformat()
         })
     except Exception as e:
-        user_logger.error(f"Error updating user session: {e}")
+        user_logger.error("Error updating user session: %s", e)
 
 def check_user_session(user_id: int) -> bool:
     """Check if user session is valid"""
@@ -267,7 +275,7 @@ def check_user_session(user_id: int) -> bool:
         session_expires = datetime.fromisoformat(user['session_expires'])
         return datetime.now() < session_expires
     except Exception as e:
-        user_logger.error(f"Error checking user session: {e}")
+        user_logger.error("Error checking user session: %s", e)
         return False
 
 # Command handlers
@@ -300,7 +308,7 @@ async def profile_command(message: Message) -> None:
         await message.answer(text, reply_markup=keyboard)
         
     except Exception as e:
-        user_logger.error(f"Error in profile command: {e}")
+        user_logger.error("Error in profile command: %s", e)
         await message.answer(
             format_error_message(e),
             parse_mode="HTML"
@@ -349,7 +357,7 @@ async def list_users_command(message: Message) -> None:
         await message.answer(text, reply_markup=keyboard.as_markup())
         
     except Exception as e:
-        admin_logger.error(f"Error in list users command: {e}")
+        admin_logger.error("Error in list users command: %s", e)
         await message.answer(
             format_error_message(e),
             parse_mode="HTML"
@@ -380,7 +388,7 @@ async def user_callback(callback: CallbackQuery) -> None:
         await edit_message(callback, text, keyboard)
         
     except Exception as e:
-        admin_logger.error(f"Error in user callback: {e}")
+        admin_logger.error("Error in user callback: %s", e)
         await callback.answer(
             format_error_message(e),
             show_alert=True
@@ -414,7 +422,7 @@ async def process_user_name(message: Message, state: FSMContext) -> None:
         )
         
     except Exception as e:
-        user_logger.error(f"Error in process user name: {e}")
+        user_logger.error("Error in process user name: %s", e)
         await message.answer(
             format_error_message(e),
             parse_mode="HTML"
@@ -453,7 +461,7 @@ async def process_user_email(message: Message, state: FSMContext) -> None:
         )
         
     except Exception as e:
-        user_logger.error(f"Error in process user email: {e}")
+        user_logger.error("Error in process user email: %s", e)
         await message.answer(
             format_error_message(e),
             parse_mode="HTML"
@@ -502,7 +510,7 @@ async def process_user_phone(message: Message, state: FSMContext) -> None:
         await state.clear()
         
     except Exception as e:
-        user_logger.error(f"Error in process user phone: {e}")
+        user_logger.error("Error in process user phone: %s", e)
         await message.answer(
             format_error_message(e),
             parse_mode="HTML"
@@ -570,7 +578,7 @@ async def search_user_command(message: Message) -> None:
         await message.answer(text, reply_markup=keyboard.as_markup())
         
     except Exception as e:
-        admin_logger.error(f"Error in search user command: {e}")
+        admin_logger.error("Error in search user command: %s", e)
         await message.answer(
             format_error_message(e),
             parse_mode="HTML"
@@ -656,13 +664,13 @@ class UserManagement:
             if not success:
                 raise UserManagementError("Failed to register user")
 
-            logger.info(f"Successfully registered user {telegram_id}")
+            logger.info("Successfully registered user %s", telegram_id)
             return True
 
         except UserAlreadyExistsError:
             raise
         except Exception as e:
-            logger.error(f"Error registering user: {e}")
+            logger.error("Error registering user: %s", e)
             raise UserManagementError(f"Failed to register user: {e}")
 
     async def get_user_profile(self, telegram_id: int) -> Optional[UserProfile]:
@@ -686,7 +694,7 @@ class UserManagement:
             )
 
         except Exception as e:
-            logger.error(f"Error getting user profile: {e}")
+            logger.error("Error getting user profile: %s", e)
             raise UserManagementError(f"Failed to get user profile: {e}")
 
     async def update_user_profile(
@@ -726,13 +734,13 @@ class UserManagement:
 
             # Execute update
             await self._db.execute(query, tuple(params))
-            logger.info(f"Successfully updated user {telegram_id}")
+            logger.info("Successfully updated user %s", telegram_id)
             return True
 
         except UserNotFoundError:
             raise
         except Exception as e:
-            logger.error(f"Error updating user profile: {e}")
+            logger.error("Error updating user profile: %s", e)
             raise UserManagementError(f"Failed to update user profile: {e}")
 
     async def authenticate_user(
@@ -744,7 +752,7 @@ class UserManagement:
         try:
             return await self._db.verify_password(telegram_id, password)
         except Exception as e:
-            logger.error(f"Error authenticating user: {e}")
+            logger.error("Error authenticating user: %s", e)
             raise UserManagementError(f"Authentication failed: {e}")
 
     async def set_user_state(
@@ -764,7 +772,7 @@ class UserManagement:
             return await self.update_user_profile(telegram_id, **updates)
 
         except Exception as e:
-            logger.error(f"Error setting user state: {e}")
+            logger.error("Error setting user state: %s", e)
             raise UserManagementError(f"Failed to set user state: {e}")
 
     async def get_user_state(self, telegram_id: int) -> tuple[Optional[UserState], Optional[Dict]]:
@@ -779,7 +787,7 @@ class UserManagement:
         except UserNotFoundError:
             raise
         except Exception as e:
-            logger.error(f"Error getting user state: {e}")
+            logger.error("Error getting user state: %s", e)
             raise UserManagementError(f"Failed to get user state: {e}")
 
     async def list_users(
@@ -825,7 +833,7 @@ class UserManagement:
             ]
 
         except Exception as e:
-            logger.error(f"Error listing users: {e}")
+            logger.error("Error listing users: %s", e)
             raise UserManagementError(f"Failed to list users: {e}")
 
     async def deactivate_user(self, telegram_id: int) -> bool:
@@ -833,7 +841,7 @@ class UserManagement:
         try:
             return await self.update_user_profile(telegram_id, is_active=False)
         except Exception as e:
-            logger.error(f"Error deactivating user: {e}")
+            logger.error("Error deactivating user: %s", e)
             raise UserManagementError(f"Failed to deactivate user: {e}")
 
     async def activate_user(self, telegram_id: int) -> bool:
@@ -841,7 +849,7 @@ class UserManagement:
         try:
             return await self.update_user_profile(telegram_id, is_active=True)
         except Exception as e:
-            logger.error(f"Error activating user: {e}")
+            logger.error("Error activating user: %s", e)
             raise UserManagementError(f"Failed to activate user: {e}")
 
     async def change_user_role(
@@ -853,7 +861,7 @@ class UserManagement:
         try:
             return await self.update_user_profile(telegram_id, role=new_role)
         except Exception as e:
-            logger.error(f"Error changing user role: {e}")
+            logger.error("Error changing user role: %s", e)
             raise UserManagementError(f"Failed to change user role: {e}")
 
     async def get_user_stats(self, telegram_id: int) -> Dict:
@@ -896,7 +904,7 @@ class UserManagement:
         except UserNotFoundError:
             raise
         except Exception as e:
-            logger.error(f"Error getting user stats: {e}")
+            logger.error("Error getting user stats: %s", e)
             raise UserManagementError(f"Failed to get user stats: {e}")
 
 # Create singleton instance
@@ -0,0 +1,50 @@
+"""Coalescing of small asynchronous writes into batches"""
+
+import asyncio
+import logging
+from typing import Any, List, Optional
+
+logger = logging.getLogger(__name__)
+
+class AsyncBatcher:
+    """Collects submitted items and processes them in batches.
+
+    A batch is flushed when it reaches ``max_batch_size`` items or when the
+    oldest queued item has waited ``max_queue_time`` seconds. Subclasses
+    implement :meth:`process_batch`.
+    """
+
+    def __init__(self, max_batch_size: int = 400, max_queue_time: float = 0.5):
+        self.max_batch_size = max_batch_size
+        self.max_queue_time = max_queue_time
+        self._items: List[Any] = []
+        self._flush_task: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+
+    async def process_batch(self, items: List[Any]) -> None:
+        """Process a batch of items"""
+        raise NotImplementedError
+
+    async def submit(self, item: Any) -> None:
+        """Queue an item for the next batch"""
+        self._items.append(item)
+        if len(self._items) >= self.max_batch_size:
+            await self.flush()
+        elif self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_later())
+
+    async def flush(self) -> None:
+        """Process all queued items immediately"""
+        async with self._lock:
+            while self._items:
+                items = self._items[:self.max_batch_size]
+                del self._items[:self.max_batch_size]
+                try:
+                    await self.process_batch(items)
+                except Exception as e:
+                    logger.error(f"Failed to process batch of {len(items)} items: {e}")
+
+    async def _flush_later(self) -> None:
+        """Flush the queue once the oldest item has waited long enough"""
+        await asyncio.sleep(self.max_queue_time)
+        await self.flush()
@@ -0,0 +1,33 @@
+"""Version counters for the in-process handler caches.
+
+Write paths bump these counters and the handlers compare them against the
+version their cached entries were built for. Keeping the counters here lets
+the management modules invalidate caches without importing handler modules.
+"""
+
+from typing import Dict
+
+# Version of the tests catalog, bumped on every write to tests, test
+# questions, products or categories
+_tests_version = 0
+
+# Versions of the per-category products lists
+_products_version: Dict[int, int] = {}
+
+def get_tests_version() -> int:
+    """Return the current tests catalog version."""
+    return _tests_version
+
+def bump_tests_version() -> None:
+    """Invalidate the cached tests list."""
+    global _tests_version
+    _tests_version += 1
+
+def get_products_version(category_id: int) -> int:
+    """Return the current products list version of a category."""
+    return _products_version.get(category_id, 0)
+
+def bump_products_version(category_id: int) -> None:
+    """Invalidate the cached products list of a category."""
+    category_id = int(category_id)
+    _products_version[category_id] = _products_version.get(category_id, 0) + 1
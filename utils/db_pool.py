@@ -71,12 +71,7 @@ class DatabasePool:
             try:
                 # Create initial connections
                 for _ in range(self.pool_size):
-                    conn = await aiosqlite.connect(self.db_file)
-                    await conn.execute("PRAGMA journal_mode=WAL")  # Enable WAL mode
-                    await conn.execute("PRAGMA synchronous=NORMAL")  # Faster writes
-                    await conn.execute("PRAGMA cache_size=-2000")  # Use 2MB of cache
-                    await conn.execute("PRAGMA temp_store=MEMORY")  # Store temp tables in memory
-                    await conn.execute("PRAGMA mmap_size=30000000000")  # Use memory mapping
+                    conn = await self._create_connection()
                     await self.pool.put(conn)
                     self.active_connections += 1
                 
@@ -88,6 +83,24 @@ class DatabasePool:
                 await self.close()  # Clean up any created connections
                 raise
     
+    async def _create_connection(self) -> aiosqlite.Connection:
+        """Open a long-lived connection configured for concurrent access."""
+        # A larger statement cache keeps the hot queries prepared
+        conn = await aiosqlite.connect(self.db_file, cached_statements=512)
+        # Rows support both index and column-name access; Database and
+        # the handlers read columns by name
+        conn.row_factory = aiosqlite.Row
+        # All PRAGMAs are sent in one call to the connection's worker thread
+        await conn.executescript(
+            "PRAGMA journal_mode=WAL;"  # Readers don't block the writer
+            "PRAGMA synchronous=NORMAL;"  # Faster writes, safe with WAL
+            "PRAGMA cache_size=-64000;"  # Up to 64MB of page cache per connection
+            "PRAGMA temp_store=MEMORY;"  # Store temp tables in memory
+            "PRAGMA mmap_size=30000000000;"  # Use memory mapping
+            "PRAGMA foreign_keys=ON;"  # Enforce the schema's ON DELETE rules
+        )
+        return conn
+    
     @asynccontextmanager
     async def acquire(self) -> AsyncGenerator[aiosqlite.Connection, None]:
         """Acquire a database connection from the pool.
@@ -111,12 +124,7 @@ class DatabasePool:
                 # If no connection is available, create a new one if possible
                 async with self._lock:
                     if self.active_connections < self.pool_size:
-                        conn = await aiosqlite.connect(self.db_file)
-                        await conn.execute("PRAGMA journal_mode=WAL")
-                        await conn.execute("PRAGMA synchronous=NORMAL")
-                        await conn.execute("PRAGMA cache_size=-2000")
-                        await conn.execute("PRAGMA temp_store=MEMORY")
-                        await conn.execute("PRAGMA mmap_size=30000000000")
+                        conn = await self._create_connection()
                         self.active_connections += 1
                         logger.debug("Created new database connection")
                     else:
@@ -160,18 +168,25 @@ class DatabasePool:
             self.active_connections = 0
             logger.info("Database pool closed")
     
-    async def execute(self, query: str, *args, **kwargs) -> None:
+    async def execute(self, query: str, *args, **kwargs) -> Optional[int]:
         """Execute a query using a connection from the pool.
         
         Args:
             query: SQL query to execute
             *args: Query parameters
             **kwargs: Additional query parameters
+            
+        Returns:
+            The rowid of the last inserted row, or None if no row changed
         """
         async with self.acquire() as conn:
             try:
-                await conn.execute(query, *args, **kwargs)
+                async with conn.execute(query, *args, **kwargs) as cursor:
+                    # lastrowid is per connection and may be left over from
+                    # an earlier statement when nothing was inserted
+                    lastrowid = cursor.lastrowid if cursor.rowcount > 0 else None
                 await conn.commit()
+                return lastrowid
             except Exception as e:
                 await conn.rollback()
                 logger.error(f"Database error executing query: {e}")
@@ -209,12 +224,41 @@ class DatabasePool:
         """
         async with self.acquire() as conn:
             try:
-                async with conn.execute(query, *args, **kwargs) as cursor:
-                    return await cursor.fetchall()
+                # Runs the query and fetches rows in a single worker-thread call
+                return list(await conn.execute_fetchall(query, *args, **kwargs))
             except Exception as e:
                 logger.error(f"Database error fetching all rows: {e}")
                 raise
     
+    async def fetchmany_iter(
+        self,
+        query: str,
+        params: tuple = (),
+        size: int = 64
+    ) -> AsyncGenerator[tuple, None]:
+        """Execute a query and yield its rows, fetched in batches.
+        
+        Args:
+            query: SQL query to execute
+            params: Query parameters
+            size: Number of rows fetched per worker-thread call
+            
+        Yields:
+            Rows, each as a tuple
+        """
+        async with self.acquire() as conn:
+            try:
+                async with conn.execute(query, params) as cursor:
+                    while True:
+                        rows = await cursor.fetchmany(size)
+                        if not rows:
+                            break
+                        for row in rows:
+                            yield row
+            except Exception as e:
+                logger.error(f"Database error iterating rows: {e}")
+                raise
+    
     async def execute_many(self, query: str, params: list[tuple]) -> None:
         """Execute a query multiple times with different parameters.
         
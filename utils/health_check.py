@@ -1,6 +1,7 @@
 """Health check handler for the application."""
 
 import logging
+import time
 from typing import Callable, Awaitable
 from aiohttp import web
 from datetime import datetime
@@ -8,8 +9,19 @@ import json
 
 from monitoring.metrics import MetricsCollector
 
+try:
+    import orjson
+
+    def _dumps(obj) -> str:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS).decode()
+except ImportError:
+    _dumps = json.dumps
+
 logger = logging.getLogger(__name__)
 
+# Probes arriving within this many seconds share one metrics snapshot
+METRICS_CACHE_TTL = 1.0
+
 def create_health_check_handler(metrics: MetricsCollector) -> Callable[[web.Request], Awaitable[web.Response]]:
     """Create a health check handler that returns application status.
     
@@ -19,6 +31,9 @@ def create_health_check_handler(metrics: MetricsCollector) -> Callable[[web.Requ
     Returns:
         A handler function that can be used with aiohttp
     """
+    # (monotonic time taken, snapshot) of the last get_metrics() call
+    cached = [float("-inf"), None]
+
     async def health_check_handler(request: web.Request) -> web.Response:
         """Handle health check requests.
         
@@ -26,8 +41,11 @@ def create_health_check_handler(metrics: MetricsCollector) -> Callable[[web.Requ
             JSON response with application status and metrics
         """
         try:
-            # Get current metrics
-            current_metrics = metrics.get_metrics()
+            # Get current metrics, reusing a snapshot taken less than a TTL ago
+            now = time.monotonic()
+            if now - cached[0] >= METRICS_CACHE_TTL:
+                cached[:] = [now, metrics.get_metrics()]
+            current_metrics = cached[1]
             
             # Check if metrics indicate any issues
             system_metrics = current_metrics.get('system', {})
@@ -58,7 +76,8 @@ def create_health_check_handler(metrics: MetricsCollector) -> Callable[[web.Requ
             # Return response with appropriate status code
             return web.json_response(
                 response,
-                status=200 if is_healthy else 503
+                status=200 if is_healthy else 503,
+                dumps=_dumps
             )
             
         except Exception as e:
@@ -15,7 +15,7 @@ async def setup_polling(dp: Dispatcher) -> None:
     try:
         # Start polling
         await dp.start_polling(
-            allowed_updates=["message", "callback_query", "inline_query"],
+            allowed_updates=["message", "callback_query"],
             drop_pending_updates=True
         )
         logger.info("Bot started in polling mode")